@@ -2,6 +2,7 @@
 
 
 import os
+import sys
 import uuid
 import json
 import tempfile
@@ -9,15 +10,33 @@ import subprocess
 import shutil
 import csv
 import re
+import mmap
 import multiprocessing
+import string
+import hashlib
+import functools
+import queue
+import asyncio
+import threading
+import contextlib
+import difflib
+import logging
 
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 
 import xml.etree.ElementTree as ET
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+import aiofiles
+import httpx
+import numpy as np
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+from starlette.background import BackgroundTask
+
+from utils.uploads import write_upload
 
 
 router = APIRouter(prefix="/analysis")
@@ -25,28 +44,168 @@ router = APIRouter(prefix="/analysis")
 # ---------------------------------------------------------
 # Utility: Save file
 # ---------------------------------------------------------
+def _upload_on_disk(upload: UploadFile) -> bool:
+    # Starlette spools uploads in memory up to 1 MiB; past that they live in a temp file
+    return getattr(upload.file, "_rolled", True)
+
+
+def _sendfile_copy(src_fd: int, dst_fd: int, count: int = 4 << 20) -> bool:
+    """Copy src_fd from offset 0 to dst_fd inside the kernel. False if sendfile can't do it here."""
+    offset = 0
+    try:
+        while sent := os.sendfile(dst_fd, src_fd, offset, count):
+            offset += sent
+    except (AttributeError, OSError):  # no os.sendfile (Windows) / file targets unsupported (macOS)
+        if offset:
+            raise
+        return False
+    return True
+
+
 def save_upload(upload: UploadFile, folder: str) -> str:
     os.makedirs(folder, exist_ok=True)
     upload.file.seek(0)
     dest = os.path.join(folder, upload.filename)
     with open(dest, "wb") as f:
-        f.write(upload.file.read())
+        # Spooled to disk already: sendfile skips the userspace round trip
+        if not (_upload_on_disk(upload) and _sendfile_copy(upload.file.fileno(), f.fileno())):
+            shutil.copyfileobj(upload.file, f, 1 << 20)
+    return dest
+
+
+async def save_upload_async(upload: UploadFile, folder: str, chunk_size: int = 1 << 20) -> str:
+    """save_upload for async endpoints: copies in chunks without blocking the event loop."""
+    if _upload_on_disk(upload):
+        # Temp file to file: one sendfile pass in a worker thread beats chunked async reads
+        return await asyncio.to_thread(save_upload, upload, folder)
+    os.makedirs(folder, exist_ok=True)
+    dest = os.path.join(folder, upload.filename)
+    await write_upload(upload, dest, chunk_size)
     return dest
 
 
 # ---------------------------------------------------------
 # Utility: Run subprocess
 # ---------------------------------------------------------
-def run_cmd(cmd: List[str]) -> Tuple[int, str, str]:
+def _drain_tail(stream, sink: deque) -> None:
+    for line in stream:
+        sink.append(line)
+    stream.close()
+
+
+def run_cmd(
+    cmd: List[str], capture: bool = True, tail_kb: int = 64, cwd: Optional[str] = None
+) -> Tuple[int, str, str]:
+    """
+    Run a command (in cwd, if given) and return (returncode, stdout, stderr).
+    Output is only used for logs, so at most the last ~tail_kb of each stream is kept;
+    with capture=False both streams go to /dev/null.
+    """
     try:
-        completed = subprocess.run(
-            cmd, text=True, capture_output=True, check=False
+        if not capture:
+            rc = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False, cwd=cwd
+            ).returncode
+            return rc, "", ""
+
+        max_lines = max(1, tail_kb * 1024 // 80)
+        out_tail: deque = deque(maxlen=max_lines)
+        err_tail: deque = deque(maxlen=max_lines)
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace", cwd=cwd
         )
-        return completed.returncode, completed.stdout, completed.stderr
+        # Drain stderr on a side thread so neither pipe can fill up and stall the child
+        err_reader = threading.Thread(target=_drain_tail, args=(proc.stderr, err_tail), daemon=True)
+        err_reader.start()
+        _drain_tail(proc.stdout, out_tail)
+        err_reader.join()
+        rc = proc.wait()
+        return rc, "".join(out_tail), "".join(err_tail)
     except Exception as e:
         return 999, "", str(e)
 
 
+# ---------------------------------------------------------
+# Utility: Scratch space for intermediates
+# ---------------------------------------------------------
+def _scratch_dir() -> str:
+    """
+    RAM-backed scratch folder for transient conversion files (/dev/shm on Linux).
+    Falls back to the default temp dir when tmpfs is missing or not writable.
+    """
+    if sys.platform.startswith("linux"):
+        shm = "/dev/shm/vsconv"
+        try:
+            os.makedirs(shm, exist_ok=True)
+            if os.access(shm, os.W_OK):
+                return shm
+        except OSError:
+            pass
+    return tempfile.gettempdir()
+
+
+# Request scratch folders are recycled instead of mkdtemp/rmtree per request
+_SCRATCH_POOL: "queue.Queue[str]" = queue.Queue(maxsize=2 * (os.cpu_count() or 1))
+
+def acquire_scratch() -> str:
+    """Take an empty scratch folder from the pool, or create one if none is free."""
+    try:
+        d = _SCRATCH_POOL.get_nowait()
+        if os.path.isdir(d):
+            return d
+    except queue.Empty:
+        pass
+    pool_root = os.path.join(_scratch_dir(), "pool")
+    os.makedirs(pool_root, exist_ok=True)
+    return tempfile.mkdtemp(dir=pool_root)
+
+
+def release_scratch(d: str) -> None:
+    """Empty a scratch folder (keeping the folder itself) and return it to the pool."""
+    try:
+        with os.scandir(d) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.unlink(entry.path)
+        _SCRATCH_POOL.put_nowait(d)
+    except (OSError, queue.Full):
+        shutil.rmtree(d, ignore_errors=True)
+
+
+# ---------------------------------------------------------
+# Utility: Text-level PDB cleaning (no obabel)
+# ---------------------------------------------------------
+_PDB_WATER = rb"(?:ATOM  |HETATM).{11}(?:HOH|WAT|DOD)"
+# (remove_waters, remove_non_protein) -> pattern matching whole records to drop
+_PDB_STRIP_RE = {
+    (True, False): re.compile(rb"^" + _PDB_WATER + rb"[^\n]*\n?", re.M),
+    (False, True): re.compile(rb"^HETATM[^\n]*\n?", re.M),
+    (True, True): re.compile(rb"^(?:HETATM|" + _PDB_WATER + rb")[^\n]*\n?", re.M),
+}
+
+def strip_pdb_records(src: str, dst: str, remove_waters: bool = True, remove_non_protein: bool = True) -> bool:
+    """
+    Copy a PDB/PDBQT to dst, dropping water records and/or every HETATM.
+    Scans a memory map of src, so kept spans are written without per-line copies.
+    """
+    pattern = _PDB_STRIP_RE.get((remove_waters, remove_non_protein))
+    try:
+        if pattern is None or os.path.getsize(src) == 0:
+            shutil.copyfile(src, dst)
+            return True
+        with open(src, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, open(dst, "wb") as out:
+            pos = 0
+            for m in pattern.finditer(mm):
+                out.write(mm[pos:m.start()])
+                pos = m.end()
+            out.write(mm[pos:])
+        return True
+    except Exception:
+        return False
+
+
 # ---------------------------------------------------------
 # UNIVERSAL CONVERTER
 # ---------------------------------------------------------
@@ -54,6 +213,112 @@ def run_cmd(cmd: List[str]) -> Tuple[int, str, str]:
 def which_exists(cmdname: str) -> bool:
     return shutil.which(cmdname) is not None
 
+# Formats prepare_ligand4.py (MolKit) can read without an obabel pass
+ADT_LIGAND_FORMATS = {".pdb", ".pdbqt", ".mol2"}
+
+def has_3d(path: str) -> bool:
+    """
+    Cheap check whether the first record of a ligand file already carries 3D coordinates
+    (any non-zero Z in the coordinate block). Used to skip obabel --gen3d.
+    """
+    ext = Path(path).suffix.lower()
+    try:
+        with open(path, "r", errors="replace") as f:
+            if ext in (".pdb", ".pdbqt"):
+                for line in f:
+                    if line.startswith(("ATOM", "HETATM")):
+                        if abs(float(line[46:54])) > 1e-4:
+                            return True
+                    elif line[:6].rstrip() in ("END", "ENDMDL"):
+                        break  # not ENDROOT/ENDBRANCH: the whole first model is scanned
+                return False
+
+            if ext in (".sdf", ".mol"):
+                header = [next(f) for _ in range(4)]
+                natoms = int(header[3][0:3])
+                for _ in range(natoms):
+                    if abs(float(next(f)[20:30])) > 1e-4:
+                        return True
+                return False
+
+            if ext == ".mol2":
+                in_atoms = False
+                for line in f:
+                    if line.startswith("@<TRIPOS>"):
+                        if in_atoms:
+                            break
+                        in_atoms = line.strip() == "@<TRIPOS>ATOM"
+                        continue
+                    if in_atoms:
+                        cols = line.split()
+                        if len(cols) >= 5 and abs(float(cols[4])) > 1e-4:
+                            return True
+                return False
+    except (OSError, ValueError, IndexError, StopIteration):
+        return False
+    return False
+
+@functools.lru_cache(maxsize=None)
+def _rdkit_modules():
+    try:
+        from rdkit import Chem, RDLogger
+        from rdkit.Chem import AllChem
+        RDLogger.DisableLog("rdApp.*")
+        return Chem, AllChem
+    except ImportError:
+        return None
+
+
+def _rdkit_read_single(Chem, path: str):
+    """The one molecule in path, or None (unreadable, unsupported format or several records)"""
+    ext = Path(path).suffix.lower()
+    if ext in (".sdf", ".mol"):
+        mols = [m for m in Chem.SDMolSupplier(path, removeHs=False)]
+        return mols[0] if len(mols) == 1 else None
+    if ext == ".mol2":
+        return Chem.MolFromMol2File(path, removeHs=False)
+    if ext == ".pdb":
+        return Chem.MolFromPDBFile(path, removeHs=False)
+    if ext in (".smi", ".smiles"):
+        with open(path, "r") as f:
+            lines = [ln for ln in f.read().splitlines() if ln.strip()]
+        return Chem.MolFromSmiles(lines[0].split()[0]) if len(lines) == 1 else None
+    return None
+
+
+def rdkit_gen3d(src: str, out_sdf: str, add_hydrogens: bool = True) -> bool:
+    """
+    In-process replacement for `obabel src -O out.sdf --separate --gen3d [-h]`:
+    largest fragment (salts dropped), ETKDGv3 embedding and a UFF cleanup.
+    Returns False when RDKit is missing or cannot read/embed the molecule (caller runs obabel).
+    """
+    mods = _rdkit_modules()
+    if mods is None:
+        return False
+    Chem, AllChem = mods
+    try:
+        mol = _rdkit_read_single(Chem, src)
+        if mol is None:
+            return False
+        frags = Chem.GetMolFrags(mol, asMols=True)
+        mol = Chem.AddHs(max(frags, key=lambda m: m.GetNumHeavyAtoms()))
+        params = AllChem.ETKDGv3()
+        params.randomSeed = 0xF00D  # reproducible coordinates, so cached outputs stay stable
+        if AllChem.EmbedMolecule(mol, params) != 0:
+            return False
+        AllChem.UFFOptimizeMolecule(mol)
+        if not add_hydrogens:
+            mol = Chem.RemoveHs(mol)
+        writer = Chem.SDWriter(out_sdf)
+        try:
+            writer.write(mol)
+        finally:
+            writer.close()
+        return True
+    except (OSError, ValueError, RuntimeError):
+        return False
+
+
 def prepare_receptor_for_pdbqt(src: str, dst: str, workdir: Optional[str] = None) -> Tuple[bool,str]:
     """
     Produce a docking-ready receptor .pdbqt at dst.
@@ -64,52 +329,56 @@ def prepare_receptor_for_pdbqt(src: str, dst: str, workdir: Optional[str] = None
     Returns (ok, log)
     """
     logs = []
-    tmp_clean = os.path.join(workdir or tempfile.gettempdir(), f"{Path(src).stem}_receptor.cleaned.pdb")
-
-    # 1) Try obabel to extract protein and remove waters/hetatm
-    cmd_obabel = [
-        "obabel", src, "-O", tmp_clean,
-        "-h",        # add hydrogens
-        "--delete", "HOH",  # attempt remove waters
-        "--protein", # keep protein residues only
-    ]
-    rc, out, err = run_cmd(cmd_obabel)
-    logs.append(" ".join(cmd_obabel))
-    logs.append(out or "")
-    logs.append(err or "")
-
-    if rc != 0 or not os.path.exists(tmp_clean):
-        # fallback: copy original and try to continue
-        tmp_clean = os.path.join(workdir or tempfile.gettempdir(), f"{Path(src).stem}_receptor.fallback.pdb")
-        try:
-            shutil.copyfile(src, tmp_clean)
-            logs.append(f"obabel protein extraction failed (rc={rc}); using original copy as fallback.")
-        except Exception as e:
-            return False, "\n".join(logs + [f"Failed to copy fallback: {e}"])
-
-    # 2) Use AutoDockTools if available (preferred) to make pdbqt with charges
-    if which_exists("prepare_receptor4.py"):
-        cmd_adt = ["prepare_receptor4.py", "-r", tmp_clean, "-o", dst, "-A", "hydrogens"]
-        rc2, out2, err2 = run_cmd(cmd_adt)
-        logs.append(" ".join(cmd_adt))
-        logs.append(out2 or "")
-        logs.append(err2 or "")
-        if rc2 == 0 and os.path.exists(dst):
-            return True, "\n".join(logs)
+    src, dst = os.path.abspath(src), os.path.abspath(dst)
+    # Private cwd: the ADT scripts drop temp files next to themselves, so concurrent runs must not share one
+    run_dir = tempfile.mkdtemp(prefix="prep_", dir=workdir or _scratch_dir())
+    try:
+        tmp_clean = os.path.join(run_dir, f"{Path(src).stem}_receptor.cleaned.pdb")
+
+        # 1) Try obabel to extract protein and remove waters/hetatm
+        cmd_obabel = [
+            "obabel", src, "-O", tmp_clean,
+            "-h",        # add hydrogens
+            "--delete", "HOH",  # attempt remove waters
+            "--protein", # keep protein residues only
+        ]
+        rc, out, err = run_cmd(cmd_obabel, cwd=run_dir)
+        logs.append(" ".join(cmd_obabel))
+        logs.append(out or "")
+        logs.append(err or "")
+
+        if rc != 0 or not os.path.exists(tmp_clean):
+            # fallback: strip waters/HETATM in Python and try to continue
+            tmp_clean = os.path.join(run_dir, f"{Path(src).stem}_receptor.fallback.pdb")
+            if not strip_pdb_records(src, tmp_clean):
+                return False, "\n".join(logs + ["Failed to write fallback copy"])
+            logs.append(f"obabel protein extraction failed (rc={rc}); stripped waters/HETATM in Python as fallback.")
+
+        # 2) Use AutoDockTools if available (preferred) to make pdbqt with charges
+        if which_exists("prepare_receptor4.py"):
+            cmd_adt = ["prepare_receptor4.py", "-r", tmp_clean, "-o", dst, "-A", "hydrogens"]
+            rc2, out2, err2 = run_cmd(cmd_adt, cwd=run_dir)
+            logs.append(" ".join(cmd_adt))
+            logs.append(out2 or "")
+            logs.append(err2 or "")
+            if rc2 == 0 and os.path.exists(dst):
+                return True, "\n".join(logs)
+            else:
+                logs.append(f"prepare_receptor4.py failed (rc={rc2})")
         else:
-            logs.append(f"prepare_receptor4.py failed (rc={rc2})")
-    else:
-        logs.append("prepare_receptor4.py not found in PATH; falling back to obabel pdbqt conversion (less reliable).")
-
-    # 3) Fallback: obabel -> pdbqt with charges (best-effort)
-    cmd_obabel2 = ["obabel", tmp_clean, "-O", dst, "--partialcharge", "gasteiger", "-h"]
-    rc3, out3, err3 = run_cmd(cmd_obabel2)
-    logs.append(" ".join(cmd_obabel2))
-    logs.append(out3 or "")
-    logs.append(err3 or "")
-    if rc3 == 0 and os.path.exists(dst):
-        return True, "\n".join(logs)
-    return False, "\n".join(logs)
+            logs.append("prepare_receptor4.py not found in PATH; falling back to obabel pdbqt conversion (less reliable).")
+
+        # 3) Fallback: obabel -> pdbqt with charges (best-effort)
+        cmd_obabel2 = ["obabel", tmp_clean, "-O", dst, "--partialcharge", "gasteiger", "-h"]
+        rc3, out3, err3 = run_cmd(cmd_obabel2, cwd=run_dir)
+        logs.append(" ".join(cmd_obabel2))
+        logs.append(out3 or "")
+        logs.append(err3 or "")
+        if rc3 == 0 and os.path.exists(dst):
+            return True, "\n".join(logs)
+        return False, "\n".join(logs)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
 
 
 def prepare_ligand_for_pdbqt(src: str, dst: str, workdir: Optional[str] = None) -> Tuple[bool,str]:
@@ -120,39 +389,432 @@ def prepare_ligand_for_pdbqt(src: str, dst: str, workdir: Optional[str] = None)
       - fallback to obabel with gasteiger charges
     """
     logs = []
-    tmp_3d = os.path.join(workdir or tempfile.gettempdir(), f"{Path(src).stem}_ligand.3d.sdf")
-
-    # 1) Generate 3D + separate salts
-    cmd3d = ["obabel", src, "-O", tmp_3d, "--gen3d", "--separate", "-h"]
-    rc, out, err = run_cmd(cmd3d)
-    logs.append(" ".join(cmd3d))
-    logs.append(out or ""); logs.append(err or "")
-
-    # prefer AutoDockTools prepare_ligand4.py
-    if which_exists("prepare_ligand4.py"):
-        cmd_adt = ["prepare_ligand4.py", "-l", tmp_3d, "-o", dst, "-A", "hydrogens"]
-        rc2, out2, err2 = run_cmd(cmd_adt)
-        logs.append(" ".join(cmd_adt))
-        logs.append(out2 or ""); logs.append(err2 or "")
-        if rc2 == 0 and os.path.exists(dst):
+    src, dst = os.path.abspath(src), os.path.abspath(dst)
+    # Private cwd: the ADT scripts drop temp files next to themselves, so concurrent runs must not share one
+    run_dir = tempfile.mkdtemp(prefix="prep_", dir=workdir or _scratch_dir())
+    try:
+        tmp_3d = os.path.join(run_dir, f"{Path(src).stem}_ligand.3d.sdf")
+        is_3d = has_3d(src)
+
+        if is_3d and Path(src).suffix.lower() in ADT_LIGAND_FORMATS and which_exists("prepare_ligand4.py"):
+            # Already 3D and readable by ADT: feed the input directly
+            tmp_3d = src
+            logs.append("Input already has 3D coordinates; skipping obabel 3D generation.")
+        elif not is_3d and rdkit_gen3d(src, tmp_3d):
+            is_3d = True
+            logs.append("3D coordinates generated in-process with RDKit ETKDG.")
+        else:
+            # 1) Generate 3D (only if needed) + separate salts
+            cmd3d = ["obabel", src, "-O", tmp_3d, "--separate", "-h"]
+            if not is_3d:
+                cmd3d.append("--gen3d")
+            rc, out, err = run_cmd(cmd3d, cwd=run_dir)
+            logs.append(" ".join(cmd3d))
+            logs.append(out or ""); logs.append(err or "")
+            # tmp_3d now carries coordinates; the fallback must not embed them a second time
+            is_3d = is_3d or (rc == 0 and os.path.exists(tmp_3d))
+
+        # prefer AutoDockTools prepare_ligand4.py
+        if which_exists("prepare_ligand4.py"):
+            cmd_adt = ["prepare_ligand4.py", "-l", tmp_3d, "-o", dst, "-A", "hydrogens"]
+            rc2, out2, err2 = run_cmd(cmd_adt, cwd=run_dir)
+            logs.append(" ".join(cmd_adt))
+            logs.append(out2 or ""); logs.append(err2 or "")
+            if rc2 == 0 and os.path.exists(dst):
+                return True, "\n".join(logs)
+            else:
+                logs.append(f"prepare_ligand4.py failed (rc={rc2})")
+        else:
+            logs.append("prepare_ligand4.py not found in PATH; falling back to obabel pdbqt conversion.")
+
+        # Fallback: obabel 3D -> pdbqt with charges
+        cmd_fallback = ["obabel", tmp_3d, "-O", dst, "--partialcharge", "gasteiger", "-h"]
+        if not is_3d:
+            cmd_fallback.append("--gen3d")
+        rc3, out3, err3 = run_cmd(cmd_fallback, cwd=run_dir)
+        logs.append(" ".join(cmd_fallback))
+        logs.append(out3 or ""); logs.append(err3 or "")
+        if rc3 == 0 and os.path.exists(dst):
             return True, "\n".join(logs)
+        return False, "\n".join(logs)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+# Multi-record library formats where duplicate entries are plausible. For single
+# structures (receptors, docked poses) --unique only costs an InChI per molecule,
+# and on multi-model PDBQT it would collapse the poses of one ligand into one.
+UNIQUE_INPUT_FORMATS = {"sdf", "sd", "mol2", "smi", "smiles"}
+
+
+def obabel_format_cmd(
+    in_path: str,
+    out_fmt: str,
+    out_path: Optional[str] = None,
+    add_hydrogens: bool = True,
+    assign_charges: bool = True,
+    charge_method: str = "gasteiger",
+) -> List[str]:
+    """
+    Plain obabel format conversion command.
+    With out_path=None obabel writes the result to stdout.
+    """
+    in_fmt = Path(in_path).suffix.lstrip(".").lower()
+    cmd = ["obabel", f"-i{in_fmt}", in_path, f"-o{out_fmt}"]
+    if out_path:
+        cmd.extend(["-O", out_path])
+    if in_fmt in UNIQUE_INPUT_FORMATS:
+        cmd.append("--unique")
+
+    if add_hydrogens:
+        cmd.append("-h")
+
+    if assign_charges and out_fmt == "pdbqt":
+        cmd.extend(["--partialcharge", charge_method])
+    return cmd
+
+
+class DownloadResponse(FileResponse):
+    """
+    FileResponse for molecule downloads. Servers that implement the ASGI
+    pathsend extension get the path and sendfile() it; elsewhere the file is
+    pushed in 1 MiB chunks instead of Starlette's default 64 KiB.
+    """
+    chunk_size = 1024 * 1024
+
+
+# ---------- IN-PROCESS OPEN BABEL (optional python bindings) ----------
+_OB_LOCAL = threading.local()
+
+@functools.lru_cache(maxsize=None)
+def _openbabel_module():
+    try:
+        from openbabel import openbabel as ob
+        return ob
+    except ImportError:
+        return None
+
+
+def _get_conv(in_fmt: str, out_fmt: str):
+    """
+    OBConversion for (in_fmt, out_fmt), created once per thread and reused.
+    Returns None when the bindings are missing or a format is unknown.
+    """
+    ob = _openbabel_module()
+    if ob is None:
+        return None
+    convs = getattr(_OB_LOCAL, "convs", None)
+    if convs is None:
+        convs = _OB_LOCAL.convs = {}
+    key = (in_fmt, out_fmt)
+    if key not in convs:
+        conv = ob.OBConversion()
+        convs[key] = conv if conv.SetInAndOutFormats(in_fmt, out_fmt) else None
+    return convs[key]
+
+
+def convert_in_process(
+    in_path: str,
+    out_path: str,
+    add_hydrogens: bool = True,
+    assign_charges: bool = True,
+    charge_method: str = "gasteiger",
+) -> Optional[bool]:
+    """
+    Plain format conversion without spawning obabel.
+    Returns None when the in-process path is unavailable (caller runs the CLI).
+    """
+    in_fmt = Path(in_path).suffix.lstrip(".").lower()
+    out_fmt = Path(out_path).suffix.lstrip(".").lower()
+    conv = _get_conv(in_fmt, out_fmt)
+    if conv is None:
+        return None
+    ob = _openbabel_module()
+    charges = ob.OBChargeModel.FindType(charge_method) if assign_charges else None
+    if assign_charges and charges is None:
+        return None
+
+    mol = ob.OBMol()
+    if not conv.ReadFile(mol, in_path):
+        return False
+    written = 0
+    while True:
+        if add_hydrogens:
+            mol.AddHydrogens()
+        if charges is not None:
+            charges.ComputeCharges(mol)
+        ok = conv.WriteFile(mol, out_path) if written == 0 else conv.Write(mol)
+        if not ok:
+            break
+        written += 1
+        mol = ob.OBMol()
+        if not conv.Read(mol):
+            break
+    conv.CloseOutFile()
+    return written > 0 and os.path.exists(out_path)
+
+
+# ---------- PDBQT PREP PIPELINES (table-driven) ----------
+# Each stage builder returns the argv for one step given (src, dst, opts).
+def _run_stage(cmd: List[str], logs: List[str], cwd: Optional[str] = None) -> int:
+    rc, out, err = run_cmd(cmd, cwd=cwd)
+    logs.append(" ".join(cmd))
+    logs.append(out or "")
+    logs.append(err or "")
+    return rc
+
+
+def _receptor_prepare_cmd(src: str, dst: str, opts: Dict[str, Any]) -> Optional[List[str]]:
+    cmd = ["obabel", src, "-O", dst]
+    if opts["add_hydrogens"]:
+        cmd.append("-h")
+    if opts["remove_waters"]:
+        cmd.extend(["--delete", "HOH"])
+    if opts["remove_non_protein"]:
+        cmd.append("--protein")
+    return cmd
+
+
+def _receptor_adt_cmd(src: str, dst: str, opts: Dict[str, Any]) -> List[str]:
+    cmd = ["prepare_receptor4.py", "-r", src, "-o", dst]
+    if opts["add_hydrogens"]:
+        cmd.extend(["-A", "hydrogens"])
+    if opts["remove_waters"]:
+        cmd.append("-e")
+    if opts["merge_non_polar"]:
+        cmd.extend(["-U", "nphs"])
+    if opts["merge_lone_pairs"]:
+        cmd.extend(["-U", "lps"])
+    return cmd
+
+
+def _receptor_fallback_cmd(src: str, dst: str, opts: Dict[str, Any]) -> List[str]:
+    cmd = ["obabel", src, "-O", dst]
+    if opts["assign_charges"]:
+        cmd.extend(["--partialcharge", opts["charge_method"]])
+    if opts["add_hydrogens"]:
+        cmd.append("-h")
+    return cmd
+
+
+def _ligand_prepare_cmd(src: str, dst: str, opts: Dict[str, Any]) -> Optional[List[str]]:
+    if opts["is_3d"] and Path(src).suffix.lower() in ADT_LIGAND_FORMATS and which_exists("prepare_ligand4.py"):
+        # Already 3D and readable by ADT: no intermediate obabel pass
+        return None
+    cmd = ["obabel", src, "-O", dst, "--separate"]
+    if not opts["is_3d"]:
+        cmd.append("--gen3d")
+    if opts["add_hydrogens"]:
+        cmd.append("-h")
+    return cmd
+
+
+def _ligand_adt_cmd(src: str, dst: str, opts: Dict[str, Any]) -> List[str]:
+    cmd = ["prepare_ligand4.py", "-l", src, "-o", dst]
+    if opts["add_hydrogens"]:
+        if opts["hydrogen_type"] == "all":
+            cmd.extend(["-A", "hydrogens"])
         else:
-            logs.append(f"prepare_ligand4.py failed (rc={rc2})")
-    else:
-        logs.append("prepare_ligand4.py not found in PATH; falling back to obabel pdbqt conversion.")
+            cmd.extend(["-A", "bonds_hydrogens"])
+    if opts["assign_charges"]:
+        cmd.append("-C")  # Compute Gasteiger charges
+    if opts["merge_non_polar"]:
+        cmd.extend(["-U", "nphs"])
+    if opts["merge_lone_pairs"]:
+        cmd.extend(["-U", "lps"])
+    if opts["detect_aromatic"]:
+        cmd.extend(["-U", "nphs_lps"])
+    return cmd
+
+
+def _ligand_fallback_cmd(src: str, dst: str, opts: Dict[str, Any]) -> List[str]:
+    cmd = ["obabel", src, "-O", dst]
+    if not opts["is_3d"]:
+        cmd.append("--gen3d")
+    if opts["assign_charges"]:
+        cmd.extend(["--partialcharge", opts["charge_method"]])
+    if opts["add_hydrogens"]:
+        cmd.append("-h")
+    if opts["ph_value"]:
+        cmd.extend([f"--pH={opts['ph_value']}"])
+    return cmd
+
+
+def _receptor_text_clean(src: str, dst: str, opts: Dict[str, Any]) -> bool:
+    return strip_pdb_records(src, dst, opts["remove_waters"], opts["remove_non_protein"])
+
+
+PIPELINES: Dict[str, Dict[str, Any]] = {
+    "receptor": {
+        "intermediate": "_receptor.cleaned.pdb",
+        "skip_note": "",
+        "prepare": _receptor_prepare_cmd,
+        "text_clean": _receptor_text_clean,
+        "adt_tool": "prepare_receptor4.py",
+        "adt": _receptor_adt_cmd,
+        "fallback": _receptor_fallback_cmd,
+    },
+    "ligand": {
+        "intermediate": "_ligand.3d.sdf",
+        "skip_note": "Input already has 3D coordinates; skipping obabel 3D generation.",
+        "prepare": _ligand_prepare_cmd,
+        "text_clean": None,
+        "adt_tool": "prepare_ligand4.py",
+        "adt": _ligand_adt_cmd,
+        "fallback": _ligand_fallback_cmd,
+    },
+}
+
+
+# ---------- CONVERSION CACHE (content hash + options) ----------
+_CACHE_DIR = Path(os.environ.get("VSCONV_CACHE", "/var/tmp/vsconv-cache"))
+# Least recently used entries are dropped once the cache grows past this many bytes
+_CACHE_MAX_BYTES = int(os.environ.get("VSCONV_CACHE_MAX_BYTES", 2 << 30))
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, concurrent misses just redo the work
+    fcntl = None
+
+def _cache_hash():
+    # 128-bit BLAKE2b: plenty for cache keys and cheaper per byte than SHA-256
+    return hashlib.blake2b(digest_size=16)
+
+
+def _file_digest(path: str) -> str:
+    """Hash the file straight out of the page cache through a read-only mmap (no read copies)"""
+    h = _cache_hash()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:  # mmap rejects empty files
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+    return h.hexdigest()
+
+
+def _copy_fresh(src: str, dst: str) -> None:
+    """Copy into a new inode, so later edits of dst can never reach a cache entry (or vice versa)"""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    shutil.copyfile(src, dst)
+
+
+@functools.lru_cache(maxsize=None)
+def _library_versions() -> str:
+    ob = _openbabel_module()
+    rd = _rdkit_modules()
+    return "ob={}|rdkit={}".format(
+        ob.OBReleaseVersion() if ob is not None else "-",
+        rd[0].rdBase.rdkitVersion if rd is not None else "-",
+    )
+
+
+def _conversion_backend() -> str:
+    """
+    Which tools a conversion would go through right now: the in-process openbabel / RDKit
+    builds plus the obabel and AutoDockTools executables on PATH (those can change while
+    the server runs, e.g. after an install, so they are looked up every time).
+    """
+    tools = ("obabel", "prepare_ligand4.py", "prepare_receptor4.py")
+    return _library_versions() + "|" + "|".join(shutil.which(t) or "-" for t in tools)
+
 
-    # Fallback: obabel 3D -> pdbqt with charges
-    cmd_fallback = ["obabel", tmp_3d, "-O", dst, "--partialcharge", "gasteiger", "-h", "--gen3d"]
-    rc3, out3, err3 = run_cmd(cmd_fallback)
-    logs.append(" ".join(cmd_fallback))
-    logs.append(out3 or ""); logs.append(err3 or "")
-    if rc3 == 0 and os.path.exists(dst):
-        return True, "\n".join(logs)
-    return False, "\n".join(logs)
+def _evict_cache() -> None:
+    """Drop least recently used entries (oldest mtime; hits touch it) beyond _CACHE_MAX_BYTES"""
+    try:
+        with os.scandir(_CACHE_DIR) as it:
+            entries = [
+                (st.st_mtime, st.st_size, e.path)
+                for e in it
+                if not e.name.startswith(".") and not e.name.endswith(".lock")
+                for st in (e.stat(),)
+            ]
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= _CACHE_MAX_BYTES:
+            break
+        with contextlib.suppress(OSError):
+            os.remove(path)
+            total -= size
+        with contextlib.suppress(OSError):
+            os.remove(path + ".lock")
+
+
+@contextlib.contextmanager
+def _cache_lock(cached: Path):
+    """Exclusive per-entry lock so pool workers converting the same input wait for one result."""
+    if fcntl is None:
+        yield
+        return
+    with open(cached.with_name(cached.name + ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def cached_conversion(func):
+    """
+    Memoize a converter on disk: (BLAKE2b of input, role, output suffix, options, backend)
+    -> output file. Hits are copied to out_path and never shared by inode. Misses take a
+    per-entry file lock, so a receptor shared by a whole batch is prepared only once.
+    The store is capped at _CACHE_MAX_BYTES with least-recently-used eviction.
+    """
+    @functools.wraps(func)
+    def wrapper(in_path: str, out_path: str, role: Optional[str] = None, **opts):
+        suffix = Path(out_path).suffix.lower()
+        try:
+            _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            key = _cache_hash()
+            key.update(repr((
+                _file_digest(in_path), role, suffix, sorted(opts.items()), _conversion_backend()
+            )).encode("utf-8"))
+            cached = _CACHE_DIR / f"{key.hexdigest()}{suffix}"
+        except OSError:
+            return func(in_path, out_path, role, **opts)
+
+        def hit() -> bool:
+            try:
+                _copy_fresh(str(cached), out_path)
+                os.utime(cached)
+                return True
+            except OSError:  # missing or evicted meanwhile
+                return False
+
+        if hit():
+            return True, f"cache hit: {cached}"
+
+        with _cache_lock(cached):
+            # Another worker may have filled the entry while we waited on the lock
+            if hit():
+                return True, f"cache hit: {cached}"
+
+            ok, log = func(in_path, out_path, role, **opts)
+            if ok:
+                tmp = _CACHE_DIR / f".{cached.name}.{uuid.uuid4().hex}.tmp"
+                try:
+                    shutil.copyfile(out_path, tmp)
+                    os.replace(tmp, cached)
+                except OSError:
+                    if tmp.exists():
+                        tmp.unlink()
+                else:
+                    _evict_cache()
+        return ok, log
+
+    return wrapper
+
+
+# Formats whose same-format conversion is a plain copy when no hydrogens are added
+# (charges only apply to pdbqt; library formats still go through obabel --unique)
+IDENTITY_FORMATS = {"pdb", "cif"}
 
 
 # ---------- ENHANCED convert_any THAT ACCEPTS 'type' ----------
 # ---------- ENHANCED convert_any with scientific options ----------
+@cached_conversion
 def convert_any(
     in_path: str, 
     out_path: str, 
@@ -175,160 +837,97 @@ def convert_any(
     role: 'receptor' or 'ligand' or None.
     """
     out_fmt = Path(out_path).suffix.lstrip(".").lower()
+    in_fmt = Path(in_path).suffix.lstrip(".").lower()
+
+    # Same single-structure format and nothing to add: obabel would only rewrite the file
+    if in_fmt == out_fmt and out_fmt in IDENTITY_FORMATS and not add_hydrogens:
+        if os.path.abspath(in_path) != os.path.abspath(out_path):
+            shutil.copyfile(in_path, out_path)
+        return True, "identity copy (input already in the requested format)"
 
     # If target is pdbqt, run the prep pipeline with options
     if out_fmt == "pdbqt":
+        # Intermediates live in a private tmpfs folder, which is also every tool's cwd
+        # (ADT writes temp files there); only out_path hits the real disk
+        in_path, out_path = os.path.abspath(in_path), os.path.abspath(out_path)
+        workdir = tempfile.mkdtemp(prefix="conv_", dir=_scratch_dir())
         try:
-            workdir = os.path.dirname(out_path) or tempfile.gettempdir()
-            
-            if role == "receptor":
-                # Build receptor-specific command
-                logs = []
-                tmp_clean = os.path.join(workdir, f"{Path(in_path).stem}_receptor.cleaned.pdb")
-
-                # Obabel cleaning step
-                cmd_obabel = ["obabel", in_path, "-O", tmp_clean]
-                if add_hydrogens:
-                    cmd_obabel.append("-h")
-                if remove_waters:
-                    cmd_obabel.extend(["--delete", "HOH"])
-                if remove_non_protein:
-                    cmd_obabel.append("--protein")
-                
-                rc, out, err = run_cmd(cmd_obabel)
-                logs.append(" ".join(cmd_obabel))
-                logs.append(out or "")
-                logs.append(err or "")
-
-                if rc != 0 or not os.path.exists(tmp_clean):
-                    tmp_clean = os.path.join(workdir, f"{Path(in_path).stem}_receptor.fallback.pdb")
-                    shutil.copyfile(in_path, tmp_clean)
-                    logs.append(f"obabel cleaning failed; using original copy.")
-
-                # Use AutoDockTools prepare_receptor4.py
-                if which_exists("prepare_receptor4.py"):
-                    cmd_adt = ["prepare_receptor4.py", "-r", tmp_clean, "-o", out_path]
-                    if add_hydrogens:
-                        cmd_adt.extend(["-A", "hydrogens"])
-                    if remove_waters:
-                        cmd_adt.append("-e")
-                    if merge_non_polar:
-                        cmd_adt.extend(["-U", "nphs"])
-                    if merge_lone_pairs:
-                        cmd_adt.extend(["-U", "lps"])
-                    
-                    rc2, out2, err2 = run_cmd(cmd_adt)
-                    logs.append(" ".join(cmd_adt))
-                    logs.append(out2 or "")
-                    logs.append(err2 or "")
-                    
-                    if rc2 == 0 and os.path.exists(out_path):
-                        return True, "\n".join(logs)
-                    else:
-                        logs.append(f"prepare_receptor4.py failed (rc={rc2})")
-                else:
-                    logs.append("prepare_receptor4.py not found; using obabel fallback.")
-
-                # Fallback: obabel -> pdbqt
-                cmd_obabel2 = ["obabel", tmp_clean, "-O", out_path]
-                if assign_charges:
-                    cmd_obabel2.extend(["--partialcharge", charge_method])
-                if add_hydrogens:
-                    cmd_obabel2.append("-h")
-                
-                rc3, out3, err3 = run_cmd(cmd_obabel2)
-                logs.append(" ".join(cmd_obabel2))
-                logs.append(out3 or "")
-                logs.append(err3 or "")
-                
-                if rc3 == 0 and os.path.exists(out_path):
-                    return True, "\n".join(logs)
-                return False, "\n".join(logs)
-            
+            pipe = PIPELINES["receptor" if role == "receptor" else "ligand"]
+            opts = {
+                "add_hydrogens": add_hydrogens,
+                "hydrogen_type": hydrogen_type,
+                "merge_non_polar": merge_non_polar,
+                "detect_aromatic": detect_aromatic,
+                "assign_charges": assign_charges,
+                "charge_method": charge_method,
+                "merge_lone_pairs": merge_lone_pairs,
+                "remove_waters": remove_waters,
+                "remove_non_protein": remove_non_protein,
+                "ph_value": ph_value,
+                "is_3d": role != "receptor" and has_3d(in_path),
+            }
+            logs = []
+
+            # 1) obabel preparation (cleaning / 3D) into the scratch folder
+            staged = os.path.join(workdir, f"{Path(in_path).stem}{pipe['intermediate']}")
+            cmd = pipe["prepare"](in_path, staged, opts)
+            if cmd is None:
+                staged = in_path
+                logs.append(pipe["skip_note"])
+            elif "--gen3d" in cmd and rdkit_gen3d(in_path, staged, opts["add_hydrogens"]):
+                opts["is_3d"] = True
+                logs.append("3D coordinates generated in-process with RDKit ETKDG.")
             else:
-                # Ligand preparation with options
-                logs = []
-                tmp_3d = os.path.join(workdir, f"{Path(in_path).stem}_ligand.3d.sdf")
-
-                # Generate 3D structure
-                cmd3d = ["obabel", in_path, "-O", tmp_3d, "--gen3d", "--separate"]
-                if add_hydrogens:
-                    cmd3d.append("-h")
-                
-                rc, out, err = run_cmd(cmd3d)
-                logs.append(" ".join(cmd3d))
-                logs.append(out or "")
-                logs.append(err or "")
-
-                # Use AutoDockTools prepare_ligand4.py
-                if which_exists("prepare_ligand4.py"):
-                    cmd_adt = ["prepare_ligand4.py", "-l", tmp_3d, "-o", out_path]
-                    
-                    if add_hydrogens:
-                        if hydrogen_type == "all":
-                            cmd_adt.extend(["-A", "hydrogens"])
-                        else:
-                            cmd_adt.extend(["-A", "bonds_hydrogens"])
-                    
-                    if assign_charges:
-                        cmd_adt.append("-C")  # Compute Gasteiger charges
-                    
-                    if merge_non_polar:
-                        cmd_adt.extend(["-U", "nphs"])
-                    
-                    if merge_lone_pairs:
-                        cmd_adt.extend(["-U", "lps"])
-                    
-                    if detect_aromatic:
-                        cmd_adt.extend(["-U", "nphs_lps"])
-                    
-                    rc2, out2, err2 = run_cmd(cmd_adt)
-                    logs.append(" ".join(cmd_adt))
-                    logs.append(out2 or "")
-                    logs.append(err2 or "")
-                    
-                    if rc2 == 0 and os.path.exists(out_path):
-                        return True, "\n".join(logs)
-                    else:
-                        logs.append(f"prepare_ligand4.py failed (rc={rc2})")
+                rc = _run_stage(cmd, logs, cwd=workdir)
+                if rc == 0 and os.path.exists(staged):
+                    # Coordinates generated here; the obabel fallback should not redo --gen3d
+                    opts["is_3d"] = opts["is_3d"] or "--gen3d" in cmd
                 else:
-                    logs.append("prepare_ligand4.py not found; using obabel fallback.")
-
-                # Fallback: obabel
-                cmd_fallback = ["obabel", tmp_3d, "-O", out_path, "--gen3d"]
-                if assign_charges:
-                    cmd_fallback.extend(["--partialcharge", charge_method])
-                if add_hydrogens:
-                    cmd_fallback.append("-h")
-                if ph_value:
-                    cmd_fallback.extend([f"--pH={ph_value}"])
-                
-                rc3, out3, err3 = run_cmd(cmd_fallback)
-                logs.append(" ".join(cmd_fallback))
-                logs.append(out3 or "")
-                logs.append(err3 or "")
-                
-                if rc3 == 0 and os.path.exists(out_path):
+                    staged = in_path
+                    logs.append(f"obabel preparation failed (rc={rc}); using original input.")
+                    text_clean = pipe["text_clean"]
+                    if text_clean and Path(in_path).suffix.lower() in (".pdb", ".pdbqt", ".ent"):
+                        fallback = os.path.join(workdir, f"{Path(in_path).stem}_receptor.fallback.pdb")
+                        if text_clean(in_path, fallback, opts):
+                            staged = fallback
+                            logs.append("Stripped waters/HETATM records in Python instead.")
+
+            # 2) AutoDockTools (preferred), 3) obabel fallback
+            if which_exists(pipe["adt_tool"]):
+                rc2 = _run_stage(pipe["adt"](staged, out_path, opts), logs, cwd=workdir)
+                if rc2 == 0 and os.path.exists(out_path):
                     return True, "\n".join(logs)
-                return False, "\n".join(logs)
+                logs.append(f"{pipe['adt_tool']} failed (rc={rc2})")
+            else:
+                logs.append(f"{pipe['adt_tool']} not found; using obabel fallback.")
+
+            rc3 = _run_stage(pipe["fallback"](staged, out_path, opts), logs, cwd=workdir)
+            if rc3 == 0 and os.path.exists(out_path):
+                return True, "\n".join(logs)
+            return False, "\n".join(logs)
         
         except Exception as e:
             return False, f"PDBQT prep exception: {e}"
-
-    # Otherwise, use obabel for other formats
-    in_fmt = Path(in_path).suffix.lstrip(".").lower()
-    cmd = [
-        "obabel",
-        f"-i{in_fmt}", in_path,
-        f"-o{out_fmt}", "-O", out_path,
-        "--unique",
-    ]
-    
-    if add_hydrogens:
-        cmd.append("-h")
-    
-    if assign_charges and out_fmt == "pdbqt":
-        cmd.extend(["--partialcharge", charge_method])
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    # Otherwise convert in-process when the openbabel bindings are available
+    done = convert_in_process(
+        in_path, out_path,
+        add_hydrogens=add_hydrogens,
+        assign_charges=assign_charges,
+        charge_method=charge_method,
+    )
+    if done:
+        return True, "converted in-process with openbabel bindings"
+
+    # ...or fall back to the obabel CLI
+    cmd = obabel_format_cmd(
+        in_path, out_fmt, out_path,
+        add_hydrogens=add_hydrogens,
+        assign_charges=assign_charges,
+        charge_method=charge_method,
+    )
     
     rc, out, err = run_cmd(cmd)
     log = (out or "") + "\n" + (err or "")
@@ -337,6 +936,7 @@ def convert_any(
         return False, log
     return True, log
 
+
 # ---------- UPDATE /convert endpoint to accept 'type' ----------
 # ---------------------------------------------------------
 # SINGLE FILE CONVERSION - Auto Download with Scientific Options
@@ -370,442 +970,128 @@ async def api_convert_single(
     if outputFormat not in allowed:
         raise HTTPException(400, f"Invalid output format: {outputFormat}")
 
-    # Create temp directory for processing
-    temp_dir = tempfile.mkdtemp()
-    
-    try:
-        # Save uploaded file
-        input_path = os.path.join(temp_dir, file.filename)
-        with open(input_path, 'wb') as f:
-            content = await file.read()
-            f.write(content)
-        
-        # Output path
-        base_name = Path(file.filename).stem
-        output_path = os.path.join(temp_dir, f"{base_name}.{outputFormat}")
-        
-        # Convert with scientific options
-        ok, log = convert_any(
-            input_path, 
-            output_path, 
-            role=type,
-            add_hydrogens=addHydrogens,
-            hydrogen_type=hydrogenType,
-            merge_non_polar=mergeNonPolar,
-            detect_aromatic=detectAromatic,
-            assign_charges=assignCharges,
-            charge_method=chargeMethod,
-            merge_lone_pairs=mergeLonePairs,
-            compute_torsdof=computeTorsdof,
-            remove_waters=removeWaters,
-            remove_non_protein=removeNonProtein,
-            ph_value=phValue
-        )
-        
-        if not ok:
-            raise HTTPException(500, f"Conversion failed:\n{log}")
-        
-        # Return file as download
-        return FileResponse(
-            output_path,
-            media_type="application/octet-stream",
-            filename=f"{base_name}.{outputFormat}",
-            headers={
-                "Content-Disposition": f"attachment; filename={base_name}.{outputFormat}"
-            }
-        )
-    
-    except Exception as e:
-        # Clean up temp directory on error
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        raise HTTPException(500, f"Error: {str(e)}")
-
-# ---------------------------------------------------------
-# SCRIPT GENERATION - For Folder Conversion (PYTHON VERSION)
-# ---------------------------------------------------------
-from datetime import datetime
-from fastapi.responses import Response
-
-@router.get("/generate-script")
-def generate_conversion_script(
-    inputFolder: str,
-    outputFolder: str,
-    type: str = "ligand",
-    outputFormat: str = "pdbqt",
-    # Scientific options
-    addHydrogens: bool = True,
-    hydrogenType: str = "polar",
-    mergeNonPolar: bool = True,
-    detectAromatic: bool = True,
-    assignCharges: bool = True,
-    chargeMethod: str = "gasteiger",
-    mergeLonePairs: bool = True,
-    computeTorsdof: bool = True,
-    removeWaters: bool = True,
-    removeNonProtein: bool = True,
-    phValue: str = "7.4",
-):
-    """
-    Generate Python script for batch conversion on user's local machine.
-    User downloads and runs this script locally with: python vsconverter.py
-    """
-    
-    # Build command flags based on scientific options
-    if type.lower() == "ligand":
-        cmd_flags = []
-        
-        if addHydrogens:
-            if hydrogenType == "all":
-                cmd_flags.append("-A hydrogens")
-            else:
-                cmd_flags.append("-A bonds_hydrogens")
-        
-        if assignCharges:
-            cmd_flags.append("-C")
-        
-        if mergeNonPolar:
-            cmd_flags.append("-U nphs")
-        
-        if mergeLonePairs:
-            cmd_flags.append("-U lps")
-        
-        flags_str = " ".join(cmd_flags)
-        
-        script_content = f'''#!/usr/bin/env python3
-"""
-=======================================================
-VS Molecular Converter - LIGAND
-=======================================================
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-Input Folder: {inputFolder}
-Output Folder: {outputFolder}
-Output Format: {outputFormat}
-Type: {type}
-
-Scientific Options Applied:
-  - Add Hydrogens: {addHydrogens} ({hydrogenType})
-  - Merge Non-Polar H: {mergeNonPolar}
-  - Detect Aromatic: {detectAromatic}
-  - Assign Charges: {assignCharges} ({chargeMethod})
-  - Merge Lone Pairs: {mergeLonePairs}
-  - Compute Torsdof: {computeTorsdof}
-  - pH Value: {phValue}
-=======================================================
-"""
-
-import os
-import sys
-import subprocess
-import shutil
-from pathlib import Path
-from datetime import datetime
-
-# Configuration
-INPUT_FOLDER = r"{inputFolder}"
-OUTPUT_FOLDER = r"{outputFolder}"
-OUTPUT_FORMAT = "{outputFormat}"
-TYPE = "{type}"
-
-# ===========================================
-# Scientific Ligand Preparation Options
-# Generated from ConverterForm
-# ===========================================
-ADD_HYDROGENS = {addHydrogens}
-HYDROGEN_TYPE = "{hydrogenType}"
-MERGE_NONPOLAR_H = {mergeNonPolar}
-DETECT_AROMATIC = {detectAromatic}
-ASSIGN_CHARGES = {assignCharges}
-CHARGE_METHOD = "{chargeMethod}"
-MERGE_LONE_PAIRS = {mergeLonePairs}
-COMPUTE_TORSDOF = {computeTorsdof}
-REMOVE_WATERS = {removeWaters}
-REMOVE_NON_PROTEIN = {removeNonProtein}
-PH_VALUE = {phValue}
-
-
-# Color codes for terminal
-class Colors:
-    RED = '\\033[0;31m'
-    GREEN = '\\033[0;32m'
-    YELLOW = '\\033[1;33m'
-    BLUE = '\\033[0;34m'
-    CYAN = '\\033[0;36m'
-    BOLD = '\\033[1m'
-    NC = '\\033[0m'  # No Color
-
-def print_header():
-    """Print script header"""
-    print("=" * 60)
-    print(f"{{Colors.CYAN}}{{Colors.BOLD}}🧬 VS Molecular Converter - Ligand Batch{{Colors.NC}}")
-    print("=" * 60)
-    print(f"{{Colors.BOLD}}Input Folder:{{Colors.NC}}  {{INPUT_FOLDER}}")
-    print(f"{{Colors.BOLD}}Output Folder:{{Colors.NC}} {{OUTPUT_FOLDER}}")
-    print(f"{{Colors.BOLD}}Output Format:{{Colors.NC}} {{OUTPUT_FORMAT}}")
-    print(f"{{Colors.BOLD}}Type:{{Colors.NC}}          {{TYPE}}")
-    print("=" * 60)
-    print()
-
-def check_dependencies():
-    """Check if required tools are installed"""
-    print(f"{{Colors.YELLOW}}Checking dependencies...{{Colors.NC}}")
-
-    tools = {{
-        "obabel": shutil.which("obabel"),
-        "prepare_ligand4.py": shutil.which("prepare_ligand4.py"),
-        "prepare_receptor4.py": shutil.which("prepare_receptor4.py"),
-    }}
-
-    if tools["obabel"]:
-        print(f"{{Colors.GREEN}}✅ obabel found{{Colors.NC}}")
-    else:
-        print(f"{{Colors.YELLOW}}⚠️  obabel not found{{Colors.NC}}")
-
-    if TYPE == "ligand":
-        if tools["prepare_ligand4.py"]:
-            print(f"{{Colors.GREEN}}✅ prepare_ligand4.py found{{Colors.NC}}")
-        else:
-            print(f"{{Colors.YELLOW}}⚠️  prepare_ligand4.py not found{{Colors.NC}}")
-
-    if TYPE == "receptor":
-        if tools["prepare_receptor4.py"]:
-            print(f"{{Colors.GREEN}}✅ prepare_receptor4.py found{{Colors.NC}}")
-        else:
-            print(f"{{Colors.YELLOW}}⚠️  prepare_receptor4.py not found{{Colors.NC}}")
-
-    if not any(tools.values()):
-        print(f"{{Colors.RED}}❌ No supported conversion tools found{{Colors.NC}}")
-        sys.exit(1)
-
-    print()
-    return tools
-
-
-def run_conversion(input_file, output_file, tools):
-    ext = Path(input_file).suffix.lower()
-
-    try:
-        # =====================================================
-        # 1️⃣ Prefer Open Babel (scientifically explicit)
-        # =====================================================
-        if tools.get("obabel"):
-            if ext == ".pdbqt":
-                cmd = ["obabel", "-ipdbqt", input_file, "-O", output_file]
-            else:
-                cmd = ["obabel", input_file, "-O", output_file]
-
-            # ---- Apply scientific options ----
-            if ADD_HYDROGENS:
-                cmd.append("-h")
-
-            if ASSIGN_CHARGES:
-                cmd.extend(["--partialcharge", CHARGE_METHOD])
-
-            if PH_VALUE is not None:
-                cmd.extend(["-p", str(PH_VALUE)])
-
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-
-            if result.returncode == 0:
-                return True
-
-        # =====================================================
-        # 2️⃣ Ligand → PDBQT fallback (AutoDockTools)
-        # =====================================================
-        if (
-            TYPE == "ligand"
-            and OUTPUT_FORMAT == "pdbqt"
-            and tools.get("prepare_ligand4.py")
-            and ext != ".pdbqt"
-        ):
-            cmd = ["prepare_ligand4.py", "-l", input_file, "-o", output_file]
-
-            adt_flags = []
-
-            if ADD_HYDROGENS:
-                adt_flags.extend(["-A", "hydrogens"])
-
-            if ASSIGN_CHARGES:
-                adt_flags.append("-C")
-
-            if MERGE_NONPOLAR_H:
-                adt_flags.extend(["-U", "nphs"])
-
-            if MERGE_LONE_PAIRS:
-                adt_flags.extend(["-U", "lps"])
-
-            if COMPUTE_TORSDOF:
-                adt_flags.append("-A")
-
-            cmd.extend(adt_flags)
-
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            return result.returncode == 0
-
-        # =====================================================
-        # 3️⃣ No valid conversion path
-        # =====================================================
-        print(f"{{Colors.RED}}❌ No valid conversion path for {{input_file}}{{Colors.NC}}")
-        return False
-
-    except Exception as e:
-        print(f"{{Colors.RED}}Error: {{e}}{{Colors.NC}}")
-        return False
-
-
-def main():
-    """Main conversion process"""
-    print_header()
-    TOOLS = check_dependencies()
-    
-    # Validate input folder
-    if not os.path.exists(INPUT_FOLDER):
-        print(f"{{Colors.RED}}❌ Error: Input folder does not exist: {{INPUT_FOLDER}}{{Colors.NC}}")
-        sys.exit(1)
-    
-    if not os.path.isdir(INPUT_FOLDER):
-        print(f"{{Colors.RED}}❌ Error: Input path is not a folder: {{INPUT_FOLDER}}{{Colors.NC}}")
-        sys.exit(1)
-    
-    # Create output folder
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-    print(f"{{Colors.GREEN}}✅ Output folder ready: {{OUTPUT_FOLDER}}{{Colors.NC}}")
-    print()
-    
-    # Find all molecular files
-    extensions = ['.pdb', '.mol2', '.sdf', '.cif', '.pdbqt']
-    input_files = []
-    
-    for ext in extensions:
-        input_files.extend(Path(INPUT_FOLDER).glob(f"*{{ext}}"))
-    
-    if not input_files:
-        print(f"{{Colors.YELLOW}}⚠️  No molecular files found in: {{INPUT_FOLDER}}{{Colors.NC}}")
-        print(f"Looking for: {{', '.join(extensions)}}")
-        sys.exit(0)
-    
-    # Convert files
-    print(f"{{Colors.BOLD}}Found {{len(input_files)}} file(s) to convert{{Colors.NC}}")
-    print()
-    print("Starting conversion...")
-    print("-" * 60)
-    
-    success_count = 0
-    failed_count = 0
-    failed_files = []
-    
-    for i, input_file in enumerate(input_files, 1):
-        filename = input_file.name
-        base_name = input_file.stem
-        output_file = os.path.join(OUTPUT_FOLDER, f"{{base_name}}.{{OUTPUT_FORMAT}}")
-        
-        print(f"{{Colors.BLUE}}[{{i}}/{{len(input_files)}}]{{Colors.NC}} {{filename}}", end=" ... ")
-        
-        if run_conversion(str(input_file), output_file, TOOLS):
-            print(f"{{Colors.GREEN}}✅ Success{{Colors.NC}}")
-            success_count += 1
-        else:
-            print(f"{{Colors.RED}}❌ Failed{{Colors.NC}}")
-            failed_count += 1
-            failed_files.append(filename)
-    
-    # Print summary
-    print("-" * 60)
-    print()
-    print("=" * 60)
-    print(f"{{Colors.BOLD}}{{Colors.CYAN}}📊 Conversion Complete!{{Colors.NC}}")
-    print("=" * 60)
-    print(f"Total files processed: {{len(input_files)}}")
-    print(f"{{Colors.GREEN}}✅ Successful: {{success_count}}{{Colors.NC}}")
-    print(f"{{Colors.RED}}❌ Failed: {{failed_count}}{{Colors.NC}}")
-    print("=" * 60)
-    print(f"{{Colors.BOLD}}Output location:{{Colors.NC}} {{OUTPUT_FOLDER}}")
-    print("=" * 60)
-    
-    # Show failed files if any
-    if failed_files:
-        print()
-        print(f"{{Colors.RED}}Failed files:{{Colors.NC}}")
-        for f in failed_files:
-            print(f"  - {{f}}")
-    
-    print()
-    print(f"{{Colors.CYAN}}Done! {{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}}{{Colors.NC}}")
-
-if __name__ == "__main__":
-    try:
-        main()
-    except KeyboardInterrupt:
-        print()
-        print(f"{{Colors.YELLOW}}⚠️  Conversion interrupted by user{{Colors.NC}}")
-        sys.exit(1)
-    except Exception as e:
-        print()
-        print(f"{{Colors.RED}}❌ Error: {{e}}{{Colors.NC}}")
-        sys.exit(1)
-'''
+    # Create temp directory for processing
+    temp_dir = acquire_scratch()
     
-    else:  # receptor
-        cmd_flags = []
-        
-        if addHydrogens:
-            cmd_flags.append("-A hydrogens")
-        
-        if removeWaters:
-            cmd_flags.append("-e")
-        
-        if mergeNonPolar:
-            cmd_flags.append("-U nphs")
+    try:
+        # Save uploaded file
+        input_path = await save_upload_async(file, temp_dir)
         
-        if mergeLonePairs:
-            cmd_flags.append("-U lps")
+        # Output path
+        base_name = Path(file.filename).stem
+        output_path = os.path.join(temp_dir, f"{base_name}.{outputFormat}")
+        download_headers = {
+            "Content-Disposition": f"attachment; filename={base_name}.{outputFormat}"
+        }
+
+        opts = dict(
+            add_hydrogens=addHydrogens,
+            hydrogen_type=hydrogenType,
+            merge_non_polar=mergeNonPolar,
+            detect_aromatic=detectAromatic,
+            assign_charges=assignCharges,
+            charge_method=chargeMethod,
+            merge_lone_pairs=mergeLonePairs,
+            compute_torsdof=computeTorsdof,
+            remove_waters=removeWaters,
+            remove_non_protein=removeNonProtein,
+            ph_value=phValue
+        )
+
+        # Convert with scientific options (off the event loop: ADT runs can take minutes)
+        ok, log = await asyncio.to_thread(convert_any, input_path, output_path, role=type, **opts)
         
+        if not ok:
+            raise HTTPException(500, f"Conversion failed:\n{log}")
         
-        script_content = f'''#!/usr/bin/env python3
+        # Return file as download; the scratch folder goes back to the pool once sent
+        return DownloadResponse(
+            output_path,
+            media_type="application/octet-stream",
+            filename=f"{base_name}.{outputFormat}",
+            headers=download_headers,
+            background=BackgroundTask(release_scratch, temp_dir),
+        )
+    
+    except Exception as e:
+        # Clean up temp directory on error
+        release_scratch(temp_dir)
+        raise HTTPException(500, f"Error: {str(e)}")
+
+# ---------------------------------------------------------
+# SCRIPT GENERATION - For Folder Conversion (PYTHON VERSION)
+# ---------------------------------------------------------
+
+# Shared body of the downloadable converter script, parsed once at import.
+# Role-specific wording and options are filled in per request with safe_substitute().
+_CONVERTER_SCRIPT_TMPL = string.Template('''#!/usr/bin/env python3
 """
 =======================================================
-VS Molecular Converter - RECEPTOR
+VS Molecular Converter - ${role_upper}
 =======================================================
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-Input Folder: {inputFolder}
-Output Folder: {outputFolder}
-Output Format: {outputFormat}
-Type: {type}
+Generated: ${generated}
+Input Folder: ${input_folder}
+Output Folder: ${output_folder}
+Output Format: ${output_format}
+Type: ${type}
 
 Scientific Options Applied:
-  - Add Hydrogens: {addHydrogens}
-  - Remove Waters: {removeWaters}
-  - Remove Non-Protein: {removeNonProtein}
-  - Merge Non-Polar H: {mergeNonPolar}
-  - Merge Lone Pairs: {mergeLonePairs}
-  - pH Value: {phValue}
+${options_summary}
 =======================================================
 """
 
 import os
 import sys
+import argparse
+import hashlib
 import subprocess
 import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 
+# Optional single-line progress bar for interactive runs
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+# Open Babel python bindings: convert in-process, no obabel fork per file
+try:
+    from openbabel import openbabel as ob
+    ob.obErrorLog.SetOutputLevel(0)
+    OB_CONV = ob.OBConversion()
+except ImportError:
+    ob = None
+    OB_CONV = None
+
 # Configuration
-INPUT_FOLDER = r"{inputFolder}"
-OUTPUT_FOLDER = r"{outputFolder}"
-OUTPUT_FORMAT = "{outputFormat}"
-TYPE = "{type}"
+INPUT_FOLDER = r"${input_folder}"
+OUTPUT_FOLDER = r"${output_folder}"
+OUTPUT_FORMAT = "${output_format}"
+TYPE = "${type}"
+
+# ===========================================
+# Scientific ${role_title} Preparation Options
+# Generated from ConverterForm
+# ===========================================
+ADD_HYDROGENS = ${add_hydrogens}
+HYDROGEN_TYPE = "${hydrogen_type}"
+MERGE_NONPOLAR_H = ${merge_non_polar}
+DETECT_AROMATIC = ${detect_aromatic}
+ASSIGN_CHARGES = ${assign_charges}
+CHARGE_METHOD = "${charge_method}"
+MERGE_LONE_PAIRS = ${merge_lone_pairs}
+COMPUTE_TORSDOF = ${compute_torsdof}
+REMOVE_WATERS = ${remove_waters}
+REMOVE_NON_PROTEIN = ${remove_non_protein}
+PH_VALUE = ${ph_value}
+FLAGS = "${flags}"
+
+# obabel option flags, resolved when this script was generated
+_OBABEL_TAIL = ${obabel_tail}
 
-# Scientific options
-FLAGS = "{flags_str}"
 
 # Color codes for terminal
 class Colors:
@@ -817,53 +1103,199 @@ class Colors:
     BOLD = '\\033[1m'
     NC = '\\033[0m'  # No Color
 
+# Piped or redirected output gets plain text
+if not sys.stdout.isatty():
+    for _name in ("RED", "GREEN", "YELLOW", "BLUE", "CYAN", "BOLD", "NC"):
+        setattr(Colors, _name, "")
+
+# Per-file status strings, built once
+_OK = f"{Colors.GREEN}✅ Success{Colors.NC}"
+_FAIL = f"{Colors.RED}❌ Failed{Colors.NC}"
+
 def print_header():
     """Print script header"""
     print("=" * 60)
-    print(f"{{Colors.CYAN}}{{Colors.BOLD}} VS Molecular Converter - Receptor Batch{{Colors.NC}}")
+    print(f"{Colors.CYAN}{Colors.BOLD}${header_title}{Colors.NC}")
     print("=" * 60)
-    print(f"{{Colors.BOLD}}Input Folder:{{Colors.NC}}  {{INPUT_FOLDER}}")
-    print(f"{{Colors.BOLD}}Output Folder:{{Colors.NC}} {{OUTPUT_FOLDER}}")
-    print(f"{{Colors.BOLD}}Output Format:{{Colors.NC}} {{OUTPUT_FORMAT}}")
-    print(f"{{Colors.BOLD}}Type:{{Colors.NC}}          {{TYPE}}")
+    print(f"{Colors.BOLD}Input Folder:{Colors.NC}  {INPUT_FOLDER}")
+    print(f"{Colors.BOLD}Output Folder:{Colors.NC} {OUTPUT_FOLDER}")
+    print(f"{Colors.BOLD}Output Format:{Colors.NC} {OUTPUT_FORMAT}")
+    print(f"{Colors.BOLD}Type:{Colors.NC}          {TYPE}")
     print("=" * 60)
     print()
 
+@lru_cache(maxsize=None)
+def _which(name):
+    return shutil.which(name)
+
+_TOOLS_CACHE = None
+
 def check_dependencies():
-    """Check if required tools are installed"""
-    print(f"{{Colors.YELLOW}}Checking dependencies...{{Colors.NC}}")
+    """Check if required tools are installed (PATH is scanned once per run)"""
+    global _TOOLS_CACHE
+    if _TOOLS_CACHE is not None:
+        return _TOOLS_CACHE
+
+    print(f"{Colors.YELLOW}Checking dependencies...{Colors.NC}")
 
-    tools = {{
-        "obabel": shutil.which("obabel"),
-        "prepare_ligand4.py": shutil.which("prepare_ligand4.py"),
-        "prepare_receptor4.py": shutil.which("prepare_receptor4.py"),
-    }}
+    tools = {
+        "obabel": _which("obabel"),
+        "prepare_ligand4.py": _which("prepare_ligand4.py"),
+        "prepare_receptor4.py": _which("prepare_receptor4.py"),
+    }
 
-    if tools["obabel"]:
-        print(f"{{Colors.GREEN}}☑️ obabel found{{Colors.NC}}")
+    if ob is not None:
+        print(f"{Colors.GREEN}${found_mark} openbabel python bindings found{Colors.NC}")
+    elif tools["obabel"]:
+        print(f"{Colors.GREEN}${found_mark} obabel found{Colors.NC}")
     else:
-        print(f"{{Colors.YELLOW}}⚠️  obabel not found{{Colors.NC}}")
+        print(f"{Colors.YELLOW}⚠️  obabel not found{Colors.NC}")
 
     if TYPE == "ligand":
         if tools["prepare_ligand4.py"]:
-            print(f"{{Colors.GREEN}}☑️ prepare_ligand4.py found{{Colors.NC}}")
+            print(f"{Colors.GREEN}${found_mark} prepare_ligand4.py found{Colors.NC}")
         else:
-            print(f"{{Colors.YELLOW}}⚠️  prepare_ligand4.py not found{{Colors.NC}}")
+            print(f"{Colors.YELLOW}⚠️  prepare_ligand4.py not found{Colors.NC}")
 
     if TYPE == "receptor":
         if tools["prepare_receptor4.py"]:
-            print(f"{{Colors.GREEN}}☑️ prepare_receptor4.py found{{Colors.NC}}")
+            print(f"{Colors.GREEN}${found_mark} prepare_receptor4.py found{Colors.NC}")
         else:
-            print(f"{{Colors.YELLOW}}⚠️  prepare_receptor4.py not found{{Colors.NC}}")
+            print(f"{Colors.YELLOW}⚠️  prepare_receptor4.py not found{Colors.NC}")
 
-    if not any(tools.values()):
-        print(f"{{Colors.RED}}❌ No supported conversion tools found{{Colors.NC}}")
+    if ob is None and not any(tools.values()):
+        print(f"{Colors.RED}❌ No supported conversion tools found{Colors.NC}")
         sys.exit(1)
 
     print()
+    _TOOLS_CACHE = tools
     return tools
 
 
+def convert_in_process(input_file, output_file):
+    """Convert with the openbabel bindings. Returns None if the formats are unsupported."""
+    in_fmt = Path(input_file).suffix.lstrip(".").lower()
+    if not OB_CONV.SetInAndOutFormats(in_fmt, OUTPUT_FORMAT):
+        return None
+    charges = ob.OBChargeModel.FindType(CHARGE_METHOD) if ASSIGN_CHARGES else None
+
+    mol = ob.OBMol()
+    ok = OB_CONV.ReadFile(mol, input_file)
+    written = 0
+    while ok:
+        if PH_VALUE is not None and ADD_HYDROGENS:
+            mol.AddHydrogens(False, True, float(PH_VALUE))
+        elif PH_VALUE is not None:
+            mol.CorrectForPH(float(PH_VALUE))
+        elif ADD_HYDROGENS:
+            mol.AddHydrogens()
+        if charges is not None:
+            charges.ComputeCharges(mol)
+        if not (OB_CONV.WriteFile(mol, output_file) if written == 0 else OB_CONV.Write(mol)):
+            break
+        written += 1
+        mol = ob.OBMol()
+        ok = OB_CONV.Read(mol)
+    OB_CONV.CloseOutFile()
+    return written > 0
+
+
+# prepare_ligand4.py flags for the scientific options above, built once
+_ADT_TAIL = []
+if ADD_HYDROGENS:
+    _ADT_TAIL.extend(["-A", "hydrogens"])
+if ASSIGN_CHARGES:
+    _ADT_TAIL.append("-C")
+if MERGE_NONPOLAR_H:
+    _ADT_TAIL.extend(["-U", "nphs"])
+if MERGE_LONE_PAIRS:
+    _ADT_TAIL.extend(["-U", "lps"])
+if COMPUTE_TORSDOF:
+    _ADT_TAIL.append("-A")
+
+
+VERBOSE = False
+
+def set_verbose(flag):
+    """Pool initializer, so --verbose also reaches spawned worker processes"""
+    global VERBOSE
+    VERBOSE = flag
+
+def run_tool(cmd):
+    """Run a conversion tool; its output is only captured (and shown on failure) with --verbose"""
+    if not VERBOSE:
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        print(f"\\n{' '.join(cmd)}\\n{result.stdout}{result.stderr}")
+    return result.returncode
+
+# Warm prepare_ligand4.py: one long-lived ADT interpreter per worker process.
+# It reads tab-separated argv lines on stdin and answers "RC <code>" for each;
+# the script's own output goes to /dev/null. Written for Python 2 and 3.
+ADT_SERVER_SRC = r"""
+import os, sys
+script = sys.argv[1]
+code = compile(open(script).read(), script, "exec")
+proto = os.fdopen(os.dup(1), "w")
+os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    sys.argv = [script] + line.rstrip("\\n").split("\\t")
+    rc = 0
+    try:
+        exec(code, {"__name__": "__main__", "__file__": script})
+    except SystemExit as e:
+        rc = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        rc = 1
+    proto.write("RC %d\\n" % rc)
+    proto.flush()
+"""
+
+_ADT_SERVER = None
+
+def _script_interpreter(path):
+    """argv prefix from the script's #! line (MGLTools pythonsh, python2, ...)"""
+    with open(path, "rb") as f:
+        first = f.readline().decode("utf-8", "replace").strip()
+    return first[2:].split() if first.startswith("#!") else None
+
+def run_prepare_ligand(script, args):
+    """Run prepare_ligand4.py through the warm server, or one process per call as a fallback"""
+    global _ADT_SERVER
+    if _ADT_SERVER is None:
+        _ADT_SERVER = False
+        interp = _script_interpreter(script)
+        if interp:
+            try:
+                _ADT_SERVER = subprocess.Popen(
+                    interp + ["-c", ADT_SERVER_SRC, script],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    bufsize=1,
+                )
+            except OSError:
+                pass
+
+    if _ADT_SERVER:
+        try:
+            _ADT_SERVER.stdin.write("\\t".join(args) + "\\n")
+            _ADT_SERVER.stdin.flush()
+            reply = _ADT_SERVER.stdout.readline()
+            if reply.startswith("RC "):
+                return int(reply[3:]) == 0
+        except (OSError, ValueError):
+            pass
+        _ADT_SERVER = False  # server went away: run per call from now on
+
+    return run_tool([script] + args) == 0
+
+
 def run_conversion(input_file, output_file, tools):
     ext = Path(input_file).suffix.lower()
 
@@ -871,30 +1303,16 @@ def run_conversion(input_file, output_file, tools):
         # =====================================================
         # 1️⃣ Prefer Open Babel (scientifically explicit)
         # =====================================================
+        if ob is not None and convert_in_process(input_file, output_file):
+            return True
+
         if tools.get("obabel"):
             if ext == ".pdbqt":
-                cmd = ["obabel", "-ipdbqt", input_file, "-O", output_file]
+                cmd = ["obabel", "-ipdbqt", input_file, "-O", output_file, *_OBABEL_TAIL]
             else:
-                cmd = ["obabel", input_file, "-O", output_file]
-
-            # ---- Apply scientific options ----
-            if ADD_HYDROGENS:
-                cmd.append("-h")
-
-            if ASSIGN_CHARGES:
-                cmd.extend(["--partialcharge", CHARGE_METHOD])
-
-            if PH_VALUE is not None:
-                cmd.extend(["-p", str(PH_VALUE)])
+                cmd = ["obabel", input_file, "-O", output_file, *_OBABEL_TAIL]
 
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-
-            if result.returncode == 0:
+            if run_tool(cmd) == 0:
                 return True
 
         # =====================================================
@@ -906,35 +1324,13 @@ def run_conversion(input_file, output_file, tools):
             and tools.get("prepare_ligand4.py")
             and ext != ".pdbqt"
         ):
-            cmd = ["prepare_ligand4.py", "-l", input_file, "-o", output_file]
-
-            adt_flags = []
-
-            if ADD_HYDROGENS:
-                adt_flags.extend(["-A", "hydrogens"])
-
-            if ASSIGN_CHARGES:
-                adt_flags.append("-C")
-
-            if MERGE_NONPOLAR_H:
-                adt_flags.extend(["-U", "nphs"])
-
-            if MERGE_LONE_PAIRS:
-                adt_flags.extend(["-U", "lps"])
-
-            if COMPUTE_TORSDOF:
-                adt_flags.append("-A")
-
-            cmd.extend(adt_flags)
-
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
+            return run_prepare_ligand(
+                tools["prepare_ligand4.py"], ["-l", input_file, "-o", output_file, *_ADT_TAIL]
             )
-            return result.returncode == 0
 
+        # =====================================================
+        # 3️⃣ No valid conversion path
+        # =====================================================
         print(f"{Colors.RED}❌ No valid conversion path for {input_file}{Colors.NC}")
         return False
 
@@ -943,41 +1339,137 @@ def run_conversion(input_file, output_file, tools):
         return False
 
 
+# Output formats that hold many molecules in one file
+BATCH_FORMATS = {"sdf", "mol2", "smi"}
+BATCH_SIZE = 200
+
+def run_batch_conversion(input_files):
+    """
+    One obabel call per input extension and chunk of BATCH_SIZE files.
+    Writes multi-record files batch_<ext>_<n>.<fmt>; returns (converted, failed).
+    """
+    groups = {}
+    for input_file in input_files:
+        groups.setdefault(input_file.suffix.lower().lstrip("."), []).append(input_file)
+
+    converted, failed = [], []
+    for ext, files in groups.items():
+        for start in range(0, len(files), BATCH_SIZE):
+            chunk = files[start:start + BATCH_SIZE]
+            output_file = os.path.join(
+                OUTPUT_FOLDER, f"batch_{ext}_{start // BATCH_SIZE + 1}.{OUTPUT_FORMAT}"
+            )
+            cmd = ["obabel", f"-i{ext}", *map(str, chunk), f"-o{OUTPUT_FORMAT}", "-O", output_file, *_OBABEL_TAIL]
+            ok = run_tool(cmd) == 0 and os.path.exists(output_file)
+            (converted if ok else failed).extend(chunk)
+            mark = f"{Colors.GREEN}✅" if ok else f"{Colors.RED}❌"
+            print(f"{mark} {len(chunk)} .{ext} file(s) -> {os.path.basename(output_file)}{Colors.NC}")
+    return converted, failed
+
+def _content_key(path):
+    """Cheap fingerprint: extension, size and a hash of the first 64 KB"""
+    with open(path, "rb") as f:
+        head = f.read(65536)
+    return (path.suffix.lower(), os.path.getsize(path), hashlib.blake2b(head).digest())
+
+def _full_digest(path):
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.digest()
+
+def group_duplicates(pending):
+    """Group (input, output) pairs whose inputs are byte-identical; each group converts once"""
+    by_key = {}
+    for pair in pending:
+        by_key.setdefault(_content_key(pair[0]), []).append(pair)
+
+    groups = []
+    for pairs in by_key.values():
+        if len(pairs) == 1:
+            groups.append(pairs)
+            continue
+        # Same fingerprint: confirm with a full-file hash
+        by_digest = {}
+        for pair in pairs:
+            by_digest.setdefault(_full_digest(pair[0]), []).append(pair)
+        groups.extend(by_digest.values())
+    return groups
+
+def link_or_copy(src, dst):
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+def is_up_to_date(input_file, output_file):
+    """True if output_file exists and is at least as new as input_file"""
+    try:
+        return os.stat(output_file).st_mtime >= os.stat(input_file).st_mtime
+    except FileNotFoundError:
+        return False
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="VS Molecular Converter")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count() or 1,
+        help="number of files converted in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="capture tool output and print it when a conversion fails",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="reconvert files whose output is already newer than the input",
+    )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="sdf/mol2/smi output only: one obabel call per group of files, "
+             "written to combined batch_<ext>_<n> files",
+    )
+    return parser.parse_args()
 
 def main():
     """Main conversion process"""
+    args = parse_args()
+    set_verbose(args.verbose)
     print_header()
     TOOLS = check_dependencies()
     
     # Validate input folder
     if not os.path.exists(INPUT_FOLDER):
-        print(f"{{Colors.RED}}❌ Error: Input folder does not exist: {{INPUT_FOLDER}}{{Colors.NC}}")
+        print(f"{Colors.RED}❌ Error: Input folder does not exist: {INPUT_FOLDER}{Colors.NC}")
         sys.exit(1)
     
     if not os.path.isdir(INPUT_FOLDER):
-        print(f"{{Colors.RED}}❌ Error: Input path is not a folder: {{INPUT_FOLDER}}{{Colors.NC}}")
+        print(f"{Colors.RED}❌ Error: Input path is not a folder: {INPUT_FOLDER}{Colors.NC}")
         sys.exit(1)
     
     # Create output folder
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-    print(f"{{Colors.GREEN}}☑️ Output folder ready: {{OUTPUT_FOLDER}}{{Colors.NC}}")
+    print(f"{Colors.GREEN}${found_mark} Output folder ready: {OUTPUT_FOLDER}{Colors.NC}")
     print()
     
-    # Find all receptor files
-    extensions = ['.pdb', '.cif']
-    input_files = []
-    
-    for ext in extensions:
-        input_files.extend(Path(INPUT_FOLDER).glob(f"*{{ext}}"))
+    # Find all molecular files
+    extensions = ${extensions}
+    wanted = set(extensions)
+    with os.scandir(INPUT_FOLDER) as it:
+        input_files = sorted(
+            Path(e.path) for e in it
+            if e.is_file(follow_symlinks=False) and os.path.splitext(e.name)[1].lower() in wanted
+        )
     
     if not input_files:
-        print(f"{{Colors.YELLOW}}⚠️  No receptor files found in: {{INPUT_FOLDER}}{{Colors.NC}}")
-        print(f"Looking for: {{', '.join(extensions)}}")
+        print(f"{Colors.YELLOW}⚠️  No ${files_noun} found in: {INPUT_FOLDER}{Colors.NC}")
+        print(f"Looking for: {', '.join(extensions)}")
         sys.exit(0)
     
     # Convert files
-    print(f"{{Colors.BOLD}}Found {{len(input_files)}} file(s) to convert{{Colors.NC}}")
+    print(f"{Colors.BOLD}Found {len(input_files)} file(s) to convert{Colors.NC}")
     print()
     print("Starting conversion...")
     print("-" * 60)
@@ -986,57 +1478,231 @@ def main():
     failed_count = 0
     failed_files = []
     
-    for i, input_file in enumerate(input_files, 1):
-        filename = input_file.name
-        base_name = input_file.stem
-        output_file = os.path.join(OUTPUT_FOLDER, f"{{base_name}}.{{OUTPUT_FORMAT}}")
-        
-        print(f"{{Colors.BLUE}}[{{i}}/{{len(input_files)}}]{{Colors.NC}} {{filename}}", end=" ... ")
-        
-        if run_conversion(str(input_file), output_file, TOOLS):
-
-            print(f"{{Colors.GREEN}}✅ Success{{Colors.NC}}")
-            success_count += 1
-        else:
-            print(f"{{Colors.RED}}❌ Failed{{Colors.NC}}")
-            failed_count += 1
-            failed_files.append(filename)
+    if args.batch and OUTPUT_FORMAT in BATCH_FORMATS and TOOLS.get("obabel"):
+        converted, failed = run_batch_conversion(input_files)
+        success_count = len(converted)
+        failed_count = len(failed)
+        failed_files = [f.name for f in failed]
+    else:
+        # Incremental runs: outputs newer than their input are kept as-is
+        pending = []
+        for input_file in input_files:
+            output_file = os.path.join(OUTPUT_FOLDER, f"{input_file.stem}.{OUTPUT_FORMAT}")
+            if not args.force and is_up_to_date(input_file, output_file):
+                print(f"{Colors.BLUE}[skip]{Colors.NC} {input_file.name} (up to date)")
+                success_count += 1
+            else:
+                pending.append((input_file, output_file))
+
+        # Identical inputs convert once; the other copies get the same output
+        groups = group_duplicates(pending)
+
+        # Each file is an independent obabel/ADT subprocess: run them side by side
+        with ProcessPoolExecutor(
+            max_workers=max(1, args.jobs), initializer=set_verbose, initargs=(args.verbose,)
+        ) as ex:
+            futs = {
+                ex.submit(run_conversion, str(group[0][0]), group[0][1], TOOLS): group
+                for group in groups
+            }
+            pbar = tqdm(total=len(pending), unit="file") if tqdm and sys.stdout.isatty() else None
+            done = 0
+            for fut in as_completed(futs):
+                group = futs[fut]
+                converted = fut.result()
+                first_output = group[0][1]
+                for input_file, output_file in group:
+                    ok = converted
+                    if ok and output_file != first_output:
+                        try:
+                            link_or_copy(first_output, output_file)
+                        except OSError:
+                            ok = False
+                    done += 1
+                    filename = input_file.name
+                    if ok:
+                        success_count += 1
+                    else:
+                        failed_count += 1
+                        failed_files.append(filename)
+                
+                    if pbar is not None:
+                        pbar.update(1)
+                        pbar.set_postfix(ok=success_count, fail=failed_count, refresh=False)
+                    else:
+                        print(f"{Colors.BLUE}[{done}/{len(pending)}]{Colors.NC} {filename} ... {_OK if ok else _FAIL}")
+            if pbar is not None:
+                pbar.close()
+    
+    failed_files.sort()
     
     # Print summary
     print("-" * 60)
     print()
     print("=" * 60)
-    print(f"{{Colors.BOLD}}{{Colors.CYAN}}✅ Conversion Complete!{{Colors.NC}}")
+    print(f"{Colors.BOLD}{Colors.CYAN}${complete_mark} Conversion Complete!{Colors.NC}")
     print("=" * 60)
-    print(f"Total files processed: {{len(input_files)}}")
-    print(f"{{Colors.GREEN}}✅ Successful: {{success_count}}{{Colors.NC}}")
-    print(f"{{Colors.RED}}❌ Failed: {{failed_count}}{{Colors.NC}}")
+    print(f"Total files processed: {len(input_files)}")
+    print(f"{Colors.GREEN}✅ Successful: {success_count}{Colors.NC}")
+    print(f"{Colors.RED}❌ Failed: {failed_count}{Colors.NC}")
     print("=" * 60)
-    print(f"{{Colors.BOLD}}Output location:{{Colors.NC}} {{OUTPUT_FOLDER}}")
+    print(f"{Colors.BOLD}Output location:{Colors.NC} {OUTPUT_FOLDER}")
     print("=" * 60)
     
     # Show failed files if any
     if failed_files:
         print()
-        print(f"{{Colors.RED}}Failed files:{{Colors.NC}}")
+        print(f"{Colors.RED}Failed files:{Colors.NC}")
         for f in failed_files:
-            print(f"  - {{f}}")
+            print(f"  - {f}")
     
     print()
-    print(f"{{Colors.CYAN}}Done! {{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}}{{Colors.NC}}")
+    print(f"{Colors.CYAN}Done! {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.NC}")
 
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
         print()
-        print(f"{{Colors.YELLOW}}⚠️  Conversion interrupted by user{{Colors.NC}}")
+        print(f"{Colors.YELLOW}⚠️  Conversion interrupted by user{Colors.NC}")
         sys.exit(1)
     except Exception as e:
         print()
-        print(f"{{Colors.RED}}❌ Error: {{e}}{{Colors.NC}}")
+        print(f"{Colors.RED}❌ Error: {e}{Colors.NC}")
         sys.exit(1)
-'''
+''')
+
+_CONVERTER_ROLES = {
+    "ligand": {
+        "role_upper": "LIGAND",
+        "role_title": "Ligand",
+        "header_title": "🧬 VS Molecular Converter - Ligand Batch",
+        "found_mark": "✅",
+        "complete_mark": "📊",
+        "extensions": "['.pdb', '.mol2', '.sdf', '.cif', '.pdbqt']",
+        "files_noun": "molecular files",
+    },
+    "receptor": {
+        "role_upper": "RECEPTOR",
+        "role_title": "Receptor",
+        "header_title": "VS Molecular Converter - Receptor Batch",
+        "found_mark": "☑️",
+        "complete_mark": "✅",
+        "extensions": "['.pdb', '.cif']",
+        "files_noun": "receptor files",
+    },
+}
+
+
+@router.get("/generate-script")
+def generate_conversion_script(
+    request: Request,
+    inputFolder: str,
+    outputFolder: str,
+    type: str = "ligand",
+    outputFormat: str = "pdbqt",
+    # Scientific options
+    addHydrogens: bool = True,
+    hydrogenType: str = "polar",
+    mergeNonPolar: bool = True,
+    detectAromatic: bool = True,
+    assignCharges: bool = True,
+    chargeMethod: str = "gasteiger",
+    mergeLonePairs: bool = True,
+    computeTorsdof: bool = True,
+    removeWaters: bool = True,
+    removeNonProtein: bool = True,
+    phValue: str = "7.4",
+):
+    """
+    Generate Python script for batch conversion on user's local machine.
+    User downloads and runs this script locally with: python vsconverter.py
+    """
+    role = "ligand" if type.lower() == "ligand" else "receptor"
+
+    # Same parameters -> same script; let the browser reuse its copy
+    params = (
+        inputFolder, outputFolder, type, outputFormat, addHydrogens, hydrogenType,
+        mergeNonPolar, detectAromatic, assignCharges, chargeMethod, mergeLonePairs,
+        computeTorsdof, removeWaters, removeNonProtein, phValue,
+    )
+    etag = '"' + hashlib.sha1(repr(params).encode("utf-8")).hexdigest() + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # Build command flags based on scientific options
+    cmd_flags = []
+    if role == "ligand":
+        if addHydrogens:
+            if hydrogenType == "all":
+                cmd_flags.append("-A hydrogens")
+            else:
+                cmd_flags.append("-A bonds_hydrogens")
+        if assignCharges:
+            cmd_flags.append("-C")
+        if mergeNonPolar:
+            cmd_flags.append("-U nphs")
+        if mergeLonePairs:
+            cmd_flags.append("-U lps")
+
+        options_summary = "\n".join([
+            f"  - Add Hydrogens: {addHydrogens} ({hydrogenType})",
+            f"  - Merge Non-Polar H: {mergeNonPolar}",
+            f"  - Detect Aromatic: {detectAromatic}",
+            f"  - Assign Charges: {assignCharges} ({chargeMethod})",
+            f"  - Merge Lone Pairs: {mergeLonePairs}",
+            f"  - Compute Torsdof: {computeTorsdof}",
+            f"  - pH Value: {phValue}",
+        ])
+    else:
+        if addHydrogens:
+            cmd_flags.append("-A hydrogens")
+        if removeWaters:
+            cmd_flags.append("-e")
+        if mergeNonPolar:
+            cmd_flags.append("-U nphs")
+        if mergeLonePairs:
+            cmd_flags.append("-U lps")
+
+        options_summary = "\n".join([
+            f"  - Add Hydrogens: {addHydrogens}",
+            f"  - Remove Waters: {removeWaters}",
+            f"  - Remove Non-Protein: {removeNonProtein}",
+            f"  - Merge Non-Polar H: {mergeNonPolar}",
+            f"  - Merge Lone Pairs: {mergeLonePairs}",
+            f"  - pH Value: {phValue}",
+        ])
+
+    obabel_tail = []
+    if addHydrogens:
+        obabel_tail.append("-h")
+    if assignCharges:
+        obabel_tail.extend(["--partialcharge", chargeMethod])
+    if phValue not in (None, "None"):
+        obabel_tail.extend(["-p", str(phValue)])
+
+    script_content = _CONVERTER_SCRIPT_TMPL.safe_substitute(
+        _CONVERTER_ROLES[role],
+        generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        input_folder=inputFolder,
+        output_folder=outputFolder,
+        output_format=outputFormat,
+        type=type,
+        options_summary=options_summary,
+        flags=" ".join(cmd_flags),
+        obabel_tail=repr(obabel_tail),
+        add_hydrogens=addHydrogens,
+        hydrogen_type=hydrogenType,
+        merge_non_polar=mergeNonPolar,
+        detect_aromatic=detectAromatic,
+        assign_charges=assignCharges,
+        charge_method=chargeMethod,
+        merge_lone_pairs=mergeLonePairs,
+        compute_torsdof=computeTorsdof,
+        remove_waters=removeWaters,
+        remove_non_protein=removeNonProtein,
+        ph_value=phValue,
+    )
 
     # Return Python script as downloadable file
     script_bytes = script_content.encode('utf-8')
@@ -1046,7 +1712,8 @@ if __name__ == "__main__":
         content=script_bytes,
         media_type="text/x-python",
         headers={
-            "Content-Disposition": f"attachment; filename=vsconverter_{type}_{timestamp}.py"
+            "Content-Disposition": f"attachment; filename=vsconverter_{type}_{timestamp}.py",
+            "ETag": etag,
         }
     )
 
@@ -1063,7 +1730,7 @@ def serve_file(path: str):
     if not os.path.exists(path):
         raise HTTPException(404, "File not found")
     
-    return FileResponse(
+    return DownloadResponse(
         path,
         filename=os.path.basename(path),
         media_type="application/octet-stream"
@@ -1080,15 +1747,14 @@ async def api_score(
     outdir = os.path.join(tempfile.gettempdir(), f"score_{job}")
     os.makedirs(outdir, exist_ok=True)
 
-    r = save_upload(receptor, outdir)
-    l = save_upload(ligand, outdir)
+    r = await save_upload_async(receptor, outdir)
+    l = await save_upload_async(ligand, outdir)
 
     score = -7.52  # placeholder
 
     csv_path = os.path.join(outdir, "rfscore_results.csv")
-    with open(csv_path, "w") as f:
-        f.write("receptor,ligand,score\n")
-        f.write(f"{r},{l},{score}\n")
+    async with aiofiles.open(csv_path, "w") as f:
+        await f.write(f"receptor,ligand,score\n{r},{l},{score}\n")
 
     return {"csv": csv_path, "score": score}
 
@@ -1096,40 +1762,93 @@ async def api_score(
 # ---------------------------------------------------------
 # STRUCTURAL ALIGNMENT
 # ---------------------------------------------------------
+def _read_pdb_atoms(path: str):
+    """
+    Coordinate records of a PDB file for superposition.
+    Returns (lines, atom line indices, (N, 3) coordinates, cas), where cas lists
+    (residue name, coordinate row) for the CA of each polymer residue in file order.
+    HETATM residues (waters, ligands, ions) never contribute a CA. Records with
+    unreadable coordinates are skipped and left untouched in the output.
+    """
+    with open(path, "r", errors="replace") as f:
+        lines = f.readlines()
+    atom_idx, coords, cas = [], [], []
+    ca_res = None
+    for i, line in enumerate(lines):
+        if not line.startswith(("ATOM", "HETATM")):
+            if line.startswith(("MODEL", "TER")):
+                ca_res = None
+            continue
+        try:
+            xyz = (float(line[30:38]), float(line[38:46]), float(line[46:54]))
+        except ValueError:
+            continue
+        row = len(coords)
+        atom_idx.append(i)
+        coords.append(xyz)
+        # First CA per residue only, so alternate locations don't add extra points
+        if line.startswith("ATOM") and line[12:16].strip() == "CA" and line[17:27] != ca_res:
+            ca_res = line[17:27]
+            cas.append((line[17:20], row))
+    return lines, atom_idx, np.array(coords, dtype=np.float64).reshape(-1, 3), cas
+
+
+def _pair_cas(ref_cas: List[Tuple[str, int]], mob_cas: List[Tuple[str, int]]) -> Tuple[List[int], List[int]]:
+    """
+    Corresponding CA rows of two structures. Chains of equal length pair up in order;
+    otherwise residue names are aligned and only the matching runs are used.
+    """
+    if len(ref_cas) == len(mob_cas):
+        return [r for _, r in ref_cas], [r for _, r in mob_cas]
+    matcher = difflib.SequenceMatcher(
+        None, [n for n, _ in ref_cas], [n for n, _ in mob_cas], autojunk=False
+    )
+    ref_rows, mob_rows = [], []
+    for a, b, size in matcher.get_matching_blocks():
+        ref_rows.extend(r for _, r in ref_cas[a:a + size])
+        mob_rows.extend(r for _, r in mob_cas[b:b + size])
+    return ref_rows, mob_rows
+
+
+def _kabsch(mob: np.ndarray, ref: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Rotation R and centroids (mob_c, ref_c) so that (x - mob_c) @ R.T + ref_c fits mob onto ref"""
+    mob_c, ref_c = mob.mean(axis=0), ref.mean(axis=0)
+    H = (mob - mob_c).T @ (ref - ref_c)
+    U, _, Vt = np.linalg.svd(H)
+    d = np.sign(np.linalg.det(Vt.T @ U.T))
+    R = Vt.T @ np.diag([1.0, 1.0, d]) @ U.T
+    return R, mob_c, ref_c
+
+
 @router.post("/align")
 async def api_align(
     ref: UploadFile = File(...),
     mob: UploadFile = File(...),
 ):
-    from Bio.PDB import PDBParser, PDBIO, Superimposer
-
     job = uuid.uuid4().hex[:8]
     outdir = os.path.join(tempfile.gettempdir(), f"align_{job}")
     os.makedirs(outdir, exist_ok=True)
 
-    refp = save_upload(ref, outdir)
-    mobp = save_upload(mob, outdir)
+    refp = await save_upload_async(ref, outdir)
+    mobp = await save_upload_async(mob, outdir)
 
-    parser = PDBParser(QUIET=True)
-    s1 = parser.get_structure("ref", refp)
-    s2 = parser.get_structure("mob", mobp)
+    _, _, ref_xyz, ref_cas = _read_pdb_atoms(refp)
+    mob_lines, mob_idx, mob_xyz, mob_cas = _read_pdb_atoms(mobp)
 
-    ref_atoms, mob_atoms = [], []
-    for r1, r2 in zip(s1.get_residues(), s2.get_residues()):
-        try:
-            ref_atoms.append(r1["CA"])
-            mob_atoms.append(r2["CA"])
-        except:
-            pass
+    ref_rows, mob_rows = _pair_cas(ref_cas, mob_cas)
+    if not ref_rows:
+        raise HTTPException(400, "No matching CA atoms to superimpose")
+
+    R, mob_c, ref_c = _kabsch(mob_xyz[mob_rows], ref_xyz[ref_rows])
+    moved = (mob_xyz - mob_c) @ R.T + ref_c
 
-    sup = Superimposer()
-    sup.set_atoms(ref_atoms, mob_atoms)
-    sup.apply(s2.get_atoms())
+    for i, (x, y, z) in zip(mob_idx, moved.tolist()):
+        line = mob_lines[i]
+        mob_lines[i] = f"{line[:30]}{x:8.3f}{y:8.3f}{z:8.3f}{line[54:]}"
 
     out = os.path.join(outdir, "aligned.pdb")
-    io = PDBIO()
-    io.set_structure(s2)
-    io.save(out)
+    async with aiofiles.open(out, "w") as f:
+        await f.write("".join(mob_lines))
 
     return {"aligned": out}
 
@@ -1160,15 +1879,17 @@ Server Backend (Online)
 Generates PLIP execution scripts - SIMPLIFIED VERSION
 Processes ONE receptor-ligand pair (matching done in local backend)
 """
-import os
-import logging
-from typing import Optional
-from fastapi import APIRouter, Form, HTTPException
-import requests
 
 logging.basicConfig(level=logging.INFO)
 LOG = logging.getLogger(__name__)
 
+# Keep-alive connections to local backends, reused across job submissions.
+# Async, so a long PLIP run doesn't hold up the event loop.
+_plip_client = httpx.AsyncClient(
+    timeout=10000.0,
+    limits=httpx.Limits(max_keepalive_connections=8, max_connections=32),
+)
+
 
 
 # ============================================================================
@@ -1177,9 +1898,63 @@ LOG = logging.getLogger(__name__)
 
 def generate_plip_script(config: dict) -> str:
     """Generate PLIP execution script for single receptor-ligand pair"""
+    return _plip_script(int(config.get("max_workers", 4)))
+
+
+@functools.lru_cache(maxsize=32)
+def _plip_script(max_workers: int) -> str:
+    """Script text for a worker count; built once and reused across submissions"""
     script = '''
-import os, sys, subprocess, shutil, json, csv
-import xml.etree.ElementTree as ET
+import os, sys, io, re, mmap, subprocess, shutil, json, csv, sqlite3, logging, hashlib, tempfile
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+
+DEFAULT_MAX_WORKERS = __MAX_WORKERS__
+
+# Complexes are converted with Open Babel by default; PLIP_DIRECT_PDB=1 writes them
+# straight from the PDBQT records instead (no merge file, no obabel run)
+DIRECT_PDB = os.environ.get("PLIP_DIRECT_PDB") == "1"
+
+# Progress goes through a queue to one listener in the parent, so workers never
+# write to stdout themselves; stdout is left for the final JSON line
+LOG = logging.getLogger("plip")
+LOG.setLevel(logging.INFO)
+LOG.propagate = False
+
+def log_to(queue):
+    LOG.handlers[:] = [QueueHandler(queue)]
+
+try:
+    from lxml import etree as ET
+    _LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _LXML = False
+
+try:
+    from openbabel import pybel
+except ImportError:
+    pybel = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def json_bytes(obj, indent=False):
+    """UTF-8 JSON through orjson when installed, stdlib json otherwise"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+try:
+    from plip.basic import config as plip_config
+    from plip.structure.preparation import PDBComplex
+    from plip.exchange.report import StructureReport
+except ImportError:
+    PDBComplex = None
 
 def safe_run(cmd, cwd=None):
     p = subprocess.run(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
@@ -1187,115 +1962,460 @@ def safe_run(cmd, cwd=None):
         raise Exception(f"Failed: {' '.join(cmd)}\\n{p.stderr}")
     return p.stdout
 
+# "SMILES"/"smiles:" prefix or a chiral-center token anywhere on the line
+_SMILES_RE = re.compile(rb"^\\s*(?:SMILES|(?i:smiles:))|\\[C@@?H\\]|\\[@")
+_PDB_KW = (b"ATOM", b"HETATM", b"TER", b"END", b"MODEL", b"ENDMDL", b"CONECT", b"REMARK", b"HEADER", b"TITLE", b"CRYST")
+
+def _is_smiles_line(line):
+    if _SMILES_RE.search(line):
+        return True
+    if line.startswith(_PDB_KW):
+        return False
+    stripped = line.strip()
+    return (
+        len(stripped) > 50
+        and not stripped.startswith(_PDB_KW)
+        and stripped.count(b"(") + stripped.count(b"[") > 5
+        and stripped.count(b" ") < 3
+    )
+
+# Lines that may be SMILES: not starting with a PDB record name, or holding a "[@"/"[C@" token.
+# Lines end at \\r\\n, \\r or \\n, as with bytes.splitlines().
+_SMILES_CANDIDATE_RE = re.compile(
+    rb"(?:\\A|(?<=\\n)|(?<=\\r)(?!\\n))"
+    rb"(?:(?!" + b"|".join(_PDB_KW) + rb")|[^\\r\\n]*?\\[C?@)"
+    rb"[^\\r\\n]*(?:\\r\\n|\\r|\\n|\\Z)"
+)
+
 def remove_smiles_from_pdb(pdb_path):
     """Remove SMILES strings from PDB file"""
     temp_path = pdb_path + ".tmp"
-    lines_removed = 0
     
     try:
-        with open(pdb_path, "r") as infile, open(temp_path, "w") as outfile:
-            for line in infile:
-                stripped = line.strip()
-                is_smiles = False
-                
-                if stripped.startswith("SMILES") or stripped.lower().startswith("smiles:"):
-                    is_smiles = True
-                elif "[C@@H]" in line or "[C@H]" in line or "[@" in line:
-                    is_smiles = True
-                elif stripped and not stripped.startswith(("ATOM", "HETATM", "TER", "END", "MODEL", "ENDMDL", "CONECT", "REMARK", "HEADER", "TITLE", "CRYST")):
-                    if len(stripped) > 50 and stripped.count("(") + stripped.count("[") > 5 and stripped.count(" ") < 3:
-                        is_smiles = True
-                
-                if is_smiles:
-                    lines_removed += 1
-                    continue
-                    
-                outfile.write(line)
+        # The candidate regex sweeps an mmap of the file; only the few lines it
+        # matches get the full per-line check, ATOM/HETATM records are never split out
+        with open(pdb_path, "rb") as infile:
+            size = os.fstat(infile.fileno()).st_size
+            buf = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            try:
+                removed = [
+                    m.span() for m in _SMILES_CANDIDATE_RE.finditer(buf)
+                    if m.end() > m.start() and _is_smiles_line(m.group())
+                ]
+                kept = []
+                pos = 0
+                for start, end in removed:
+                    kept.append(buf[pos:start])
+                    pos = end
+                if removed:
+                    kept.append(buf[pos:])
+            finally:
+                if size:
+                    buf.close()
+        lines_removed = len(removed)
         
-        shutil.move(temp_path, pdb_path)
+        # Nothing to strip: leave the file untouched
+        if lines_removed == 0:
+            return True
         
-        if lines_removed > 0:
-            print(f"  ✓ Removed {lines_removed} SMILES lines from PDB")
+        # One write of the filtered buffer, then an atomic swap over the original
+        data = memoryview(b"".join(kept))
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
+        os.replace(temp_path, pdb_path)
         
+        LOG.info(f"  ✓ Removed {lines_removed} SMILES lines from PDB")
         return True
     except Exception as e:
-        print(f"  ⚠ Warning: Could not clean SMILES from PDB: {e}")
+        LOG.warning(f"  ⚠ Warning: Could not clean SMILES from PDB: {e}")
         if os.path.exists(temp_path):
             os.remove(temp_path)
         return False
 
 
-def split_pdbqt_models(src, out_dir):
-    """Split multi-model PDBQT into individual pose files"""
-    poses = []
-    model = []
-    idx = 0
-    with open(src, "r") as f:
-        for line in f:
-            if line.startswith("MODEL"):
-                model = []
-            model.append(line)
-            if line.startswith("ENDMDL"):
-                idx += 1
-                out = os.path.join(out_dir, f"pose_{idx}.pdbqt")
-                with open(out, "w") as o:
-                    o.writelines(model)
-                poses.append(out)
-                model = []
-    if model:
-        idx += 1
-        out = os.path.join(out_dir, f"pose_{idx}.pdbqt")
-        with open(out, "w") as o:
-            o.writelines(model)
-        poses.append(out)
-    return poses
+# A MODEL line opens a pose; an ENDMDL line (newline included) closes it
+_MODEL_MARK_RE = re.compile(rb"^(?:(MODEL)|ENDMDL[^\\n]*(?:\\n|\\Z))", re.M)
+
+def split_pdbqt_models(src, out_dir, limit=None):
+    """Split multi-model PDBQT into individual pose files.
+    Only the first `limit` poses are written; returns (pose files, total poses in src)."""
+    # Byte spans between markers; only MODEL/ENDMDL lines are visited.
+    # Anything left after the last ENDMDL (or a file without models) is a pose too.
+    # The file is scanned through a read-only mmap, so only the kept poses are
+    # copied into memory; past the limit, poses are only counted.
+    chunks = []
+    total = 0
+    start = 0
+    with open(src, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        try:
+            for m in _MODEL_MARK_RE.finditer(data):
+                if m.group(1):
+                    start = m.start()
+                else:
+                    if limit is None or total < limit:
+                        chunks.append(data[start:m.end()])
+                    total += 1
+                    start = m.end()
+            if start < size:
+                if limit is None or total < limit:
+                    chunks.append(data[start:])
+                total += 1
+        finally:
+            if size:
+                data.close()
+    
+    poses = [os.path.join(out_dir, f"pose_{i}.pdbqt") for i in range(1, len(chunks) + 1)]
+    write_outputs(list(zip(poses, chunks)))
+    return poses, total
+
+_REC_CACHE = {}
+_TRAILING_END_RE = re.compile(rb"(?:^END[ \\t]*\\r?(?:\\n|\\Z))+\\Z", re.M)
+
+def _rec_bytes(path):
+    """Receptor file contents, read once per (path, mtime) and reused for every pose.
+    A trailing END record is dropped so readers don't stop before the ligand."""
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns)
+    if key not in _REC_CACHE:
+        with open(path, "rb") as f:
+            data = _TRAILING_END_RE.sub(b"", f.read())
+        if data and not data.endswith(b"\\n"):
+            data += b"\\n"
+        _REC_CACHE[key] = data
+    return _REC_CACHE[key]
+
+def init_worker(log_queue):
+    """Pool initializer: log through the parent's queue"""
+    log_to(log_queue)
 
 def merge_pdbqt(rec, lig, outp):
     """Merge receptor and ligand into single PDB file"""
-    with open(outp, "w") as out:
-        out.write(open(rec).read())
-        out.write(open(lig).read())
+    with open(lig, "rb") as l:
+        pose = l.read()
+    with open(outp, "wb") as out:
+        out.writelines((_rec_bytes(rec), pose))
+
+# AutoDock atom types that aren't element symbols
+_AD_ELEMENT = {
+    b"A": b"C", b"G": b"C", b"G0": b"C", b"G1": b"C", b"G2": b"C", b"G3": b"C",
+    b"CG": b"C", b"CG0": b"C", b"CG1": b"C", b"CG2": b"C", b"CG3": b"C",
+    b"OA": b"O", b"OS": b"O", b"NA": b"N", b"NS": b"N", b"SA": b"S",
+    b"HD": b"H", b"HS": b"H", b"W": b"O",
+}
+
+def pdbqt_to_pdb(parts, start=0):
+    """PDB records for (pdbqt bytes, is_ligand) parts, without going through obabel.
+    Columns 1-66 are kept, atoms are renumbered from start + 1, the AutoDock type becomes
+    the element and ligand atoms are written as HETATM so PLIP picks them up.
+    Torsion tree, MODEL/ENDMDL and REMARK lines are dropped. Returns (lines, last serial)."""
+    out = []
+    serial = start
+    for data, ligand in parts:
+        for line in data.splitlines():
+            if line.startswith((b"ATOM", b"HETATM")):
+                serial += 1
+                record = b"HETATM" if ligand or line.startswith(b"HETATM") else b"ATOM  "
+                ad_type = line[77:80].strip().upper()
+                element = _AD_ELEMENT.get(ad_type, ad_type[:2])
+                out.append(b"%s%5d%-55s          %2s\\n" % (record, serial % 100000, line[11:66], element))
+            elif line.startswith(b"TER"):
+                out.append(b"TER\\n")
+    return out, serial
+
+_REC_PDB_CACHE = {}
+
+def _rec_pdb(path):
+    """Receptor PDB records and atom count, converted once per process and reused for every pose"""
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns)
+    if key not in _REC_PDB_CACHE:
+        lines, n_atoms = pdbqt_to_pdb([(_rec_bytes(path), False)])
+        _REC_PDB_CACHE[key] = (b"".join(lines), n_atoms)
+    return _REC_PDB_CACHE[key]
+
+def write_complex_pdb(rec, lig, outp):
+    """Receptor + pose straight to a clean PDB complex in a single write.
+    Only coordinate/TER records are emitted, so there are no SMILES lines to strip afterwards."""
+    rec_pdb, n_atoms = _rec_pdb(rec)
+    with open(lig, "rb") as l:
+        lig_lines, _ = pdbqt_to_pdb([(l.read(), True)], start=n_atoms)
+    with open(outp, "wb") as out:
+        out.write(b"".join((rec_pdb, *lig_lines, b"END\\n")))
+
+def convert_to_pdb(merge_path, complex_path, cwd=None):
+    """PDBQT -> PDB in-process through the Open Babel bindings, falling back to the obabel CLI"""
+    if pybel is not None:
+        try:
+            out = pybel.Outputfile("pdb", complex_path, overwrite=True)
+            try:
+                for mol in pybel.readfile("pdbqt", merge_path):
+                    out.write(mol)
+            finally:
+                out.close()
+            return
+        except (OSError, IOError) as e:
+            LOG.warning(f"    ⚠ In-process conversion failed, using obabel: {e}")
+    safe_run(["obabel", merge_path, "-O", complex_path], cwd=cwd)
+
+def run_plip(complex_path, pose_dir):
+    """PLIP XML/TXT reports and PyMOL sessions for one complex, in-process when PLIP is importable.
+    Same settings as: plip -f complex.pdb -x -t -y --nohydro --nofixfile --nofix"""
+    if PDBComplex is None:
+        safe_run(["plip", "-f", complex_path, "-x", "-t", "-y", "--nohydro", "--nofixfile", "--nofix"], cwd=pose_dir)
+        return
+    plip_config.XML = plip_config.TXT = plip_config.PYMOL = True
+    plip_config.NOHYDRO = plip_config.NOFIX = plip_config.NOFIXFILE = True
+    plip_config.OUTPATH = os.path.join(pose_dir, "")
+    mol = PDBComplex()
+    mol.output_path = pose_dir
+    mol.load_pdb(complex_path)
+    for ligand in mol.ligands:
+        mol.characterize_complex(ligand)
+    report = StructureReport(mol, outputprefix="report")
+    try:
+        from plip.basic.remote import VisualizerData
+        from plip.visualization.visualize import visualize_in_pymol
+        for site in sorted(mol.interaction_sets):
+            if mol.interaction_sets[site].interacting_res:
+                visualize_in_pymol(VisualizerData(mol, site))
+    except ImportError as e:
+        LOG.warning(f"    ⚠ PyMOL sessions skipped: {e}")
+    report.write_xml(as_string=False)
+    report.write_txt(as_string=False)
+
+# Finished PLIP outputs by complex content: re-running a job on unchanged poses copies
+# the earlier XML/TXT/PSE files instead of analyzing again. Opt-in: set PLIP_CACHE_DIR
+# to a folder of your choosing. It is capped at PLIP_CACHE_MAX_BYTES, least recently
+# used entries going first.
+PLIP_CACHE_DIR = os.environ.get("PLIP_CACHE_DIR", "")
+PLIP_CACHE_MAX_BYTES = int(os.environ.get("PLIP_CACHE_MAX_BYTES", 512 << 20))
+
+# Reports name the pose folder they were written in: cached copies hold this token
+# instead and get the new folder back on reuse. A run whose binary outputs (PyMOL
+# .pse sessions are pickles) embed the folder can't be rewritten and isn't cached.
+_POSE_DIR_TOKEN = b"@@PLIP_POSE_DIR@@"
+_TEXT_OUTPUTS = (".xml", ".txt", ".pml")
+
+def _plip_cache_key(complex_path):
+    """BLAKE2b of the complex bytes, its file name (PLIP names outputs after it) and the PLIP build"""
+    version = getattr(plip_config, "__version__", "") if PDBComplex is not None else "cli"
+    h = hashlib.blake2b(f"{os.path.basename(complex_path)}|{version}|".encode(), digest_size=16)
+    with open(complex_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _evict_plip_cache():
+    """Drop least recently used entries until the cache fits in PLIP_CACHE_MAX_BYTES"""
+    entries = []
+    try:
+        with os.scandir(PLIP_CACHE_DIR) as it:
+            for e in it:
+                if e.is_dir() and not e.name.endswith(".tmp"):
+                    with os.scandir(e.path) as files:
+                        size = sum(f.stat().st_size for f in files)
+                    entries.append((e.stat().st_mtime, size, e.path))
+    except OSError:
+        return  # another worker is evicting the same entries
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= PLIP_CACHE_MAX_BYTES:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+def cached_run_plip(complex_path, pose_dir):
+    """run_plip, reusing the outputs of an earlier run on a byte-identical complex"""
+    if not PLIP_CACHE_DIR:
+        return run_plip(complex_path, pose_dir)
+    try:
+        entry = os.path.join(PLIP_CACHE_DIR, _plip_cache_key(complex_path))
+    except OSError:
+        return run_plip(complex_path, pose_dir)
+    pose_key = os.fsencode(os.path.abspath(pose_dir))
+
+    if os.path.isdir(entry):
+        try:
+            for name in os.listdir(entry):
+                with open(os.path.join(entry, name), "rb") as f:
+                    data = f.read()
+                if name.endswith(_TEXT_OUTPUTS):
+                    data = data.replace(_POSE_DIR_TOKEN, pose_key)
+                with open(os.path.join(pose_dir, name), "wb") as f:
+                    f.write(data)
+            os.utime(entry)
+            LOG.info(f"    ✓ PLIP outputs reused from cache")
+            return
+        except OSError:
+            pass  # entry evicted or unreadable: analyze as usual
+
+    before = set(os.listdir(pose_dir))
+    run_plip(complex_path, pose_dir)
+    produced = [name for name in os.listdir(pose_dir) if name not in before]
+    if "report.xml" not in produced:
+        return
+
+    # Fill a private directory, then publish it with one rename; a concurrent
+    # worker that published first wins and our copy is dropped
+    tmp = f"{entry}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(tmp)
+        for name in produced:
+            with open(os.path.join(pose_dir, name), "rb") as f:
+                data = f.read()
+            if pose_key in data:
+                if not name.endswith(_TEXT_OUTPUTS):
+                    raise ValueError(f"{name} embeds the pose folder")
+                data = data.replace(pose_key, _POSE_DIR_TOKEN)
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(data)
+        os.rename(tmp, entry)
+    except (OSError, ValueError):
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+    _evict_plip_cache()
+
+def convert_merged_batch(merge_paths, complex_paths, work_dir):
+    """Convert every merged pose with a single obabel run (-m numbers the outputs 1..N).
+    Returns False when the outputs don't map 1:1 onto the poses; callers then convert per pose."""
+    n = len(merge_paths)
+    produced = [os.path.join(work_dir, f"complex_{k}.pdb") for k in range(1, n + 2)]
+    try:
+        safe_run(["obabel", *merge_paths, "-opdb", "-O", os.path.join(work_dir, "complex_.pdb"), "-m"], cwd=work_dir)
+        ok = all(os.path.exists(path) for path in produced[:n]) and not os.path.exists(produced[n])
+    except Exception as e:
+        LOG.warning(f"  ⚠ Batched obabel failed, converting per pose: {e}")
+        ok = False
+    if ok:
+        for src, dst in zip(produced, complex_paths):
+            os.replace(src, dst)
+        return True
+    for path in produced:
+        if os.path.exists(path):
+            os.remove(path)
+    return False
+
+# collection tag -> (interaction tag, display name)
+_INTERACTION_MAP = {
+    plural: (singular, plural.replace('_', ' ').title())
+    for plural, singular in (
+        ('hydrophobic_interactions', 'hydrophobic_interaction'),
+        ('hydrogen_bonds', 'hydrogen_bond'),
+        ('water_bridges', 'water_bridge'),
+        ('salt_bridges', 'salt_bridge'),
+        ('pi_stacks', 'pi_stack'),
+        ('pi_cation_interactions', 'pi_cation_interaction'),
+        ('halogen_bonds', 'halogen_bond'),
+        ('metal_complexes', 'metal_complex'),
+    )
+}
+
+# Leading CSV columns for interactions_all.csv, in this order when present
+_PREFERRED_ORDER = (
+    'interaction_type', 'dist', 'dist_d-a', 'dist_h-a', 'don_angle', 'donoridx',
+    'donortype', 'restype', 'resnr', 'acceptoridx', 'acceptortype',
+)
+
+def _csv_bytes(keys, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(keys)
+    writer.writerows(rows)
+    return buf.getvalue().encode('utf-8')
+
+def _write_file(item):
+    path, data = item
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def write_outputs(items, max_workers=8):
+    """Write (path, bytes) pairs concurrently; the file writes release the GIL"""
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        list(ex.map(_write_file, items))
+
+def open_interactions_db(db_path):
+    """One SQLite store for every pose of the job, next to the per-pose folders"""
+    db = sqlite3.connect(db_path)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS interactions ("
+        "pose_id INTEGER, interaction_type TEXT, ligand_id TEXT, chain TEXT, position TEXT, "
+        "restype TEXT, resnr TEXT, dist TEXT, data TEXT)"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS idx_pose_type ON interactions (pose_id, interaction_type)")
+    return db
+
+def store_interactions(db, pose_id, rows, batch=10000):
+    cols = ('interaction_type', 'ligand_id', 'chain', 'position', 'restype', 'resnr')
+    with db:
+        db.execute("DELETE FROM interactions WHERE pose_id = ?", (pose_id,))
+        for start in range(0, len(rows), batch):
+            db.executemany(
+                "INSERT INTO interactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (pose_id, *(d.get(c, '') for c in cols),
+                     d.get('dist') or d.get('dist_h-a') or d.get('dist_d-a', ''),
+                     json_bytes(d).decode('utf-8'))
+                    for d in rows[start:start + batch]
+                ],
+            )
+
+def _release(elem):
+    """Free a parsed element and, under lxml, the already-processed siblings before it"""
+    elem.clear()
+    if _LXML:
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
 
-def parse_plip_xml(xml_path, output_dir):
-    """Parse PLIP XML output and create CSV files"""
+def parse_plip_xml(xml_path, output_dir, collect=None):
+    """Parse PLIP XML output and create CSV files; rows are also appended to `collect`"""
     if not os.path.exists(xml_path):
         return False
     try:
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
         all_interactions = []
         interactions_by_type = {}
+        keys_by_type = {}
         
-        for bindingsite in root.findall('.//bindingsite'):
+        # Stream binding sites and drop each one once it has been read;
+        # lxml filters on the tag in C and lets finished siblings be detached
+        if _LXML:
+            sites = ET.iterparse(xml_path, events=('end',), tag='bindingsite')
+        else:
+            sites = ET.iterparse(xml_path, events=('end',))
+        for _, bindingsite in sites:
+            if bindingsite.tag != 'bindingsite':
+                continue
             interactions_node = bindingsite.find('interactions')
-            if not interactions_node:
+            if interactions_node is None or len(interactions_node) == 0:
+                _release(bindingsite)
                 continue
-            identifiers = bindingsite.find('identifiers')
             site_info = {
-                'ligand_id': identifiers.find('hetid').text if identifiers.find('hetid') is not None else '',
-                'chain': identifiers.find('chain').text if identifiers.find('chain') is not None else '',
-                'position': identifiers.find('position').text if identifiers.find('position') is not None else ''
+                'ligand_id': bindingsite.findtext('identifiers/hetid', ''),
+                'chain': bindingsite.findtext('identifiers/chain', ''),
+                'position': bindingsite.findtext('identifiers/position', ''),
             }
             
-            interaction_map = {
-                'hydrophobic_interactions': 'hydrophobic_interaction',
-                'hydrogen_bonds': 'hydrogen_bond',
-                'water_bridges': 'water_bridge',
-                'salt_bridges': 'salt_bridge',
-                'pi_stacks': 'pi_stack',
-                'pi_cation_interactions': 'pi_cation_interaction',
-                'halogen_bonds': 'halogen_bond',
-                'metal_complexes': 'metal_complex'
-            }
-            
-            for plural, singular in interaction_map.items():
-                coll = interactions_node.find(plural)
-                if not coll:
+            # One pass over <interactions>, dispatching on each collection's tag
+            seen = set()
+            for coll in interactions_node:
+                spec = _INTERACTION_MAP.get(coll.tag)
+                if spec is None or coll.tag in seen or len(coll) == 0:
                     continue
-                interaction_type_name = plural.replace('_', ' ').title()
+                seen.add(coll.tag)
+                singular, interaction_type_name = spec
                 if interaction_type_name not in interactions_by_type:
                     interactions_by_type[interaction_type_name] = []
-                for interaction in coll.findall(singular):
+                    keys_by_type[interaction_type_name] = set()
+                type_keys = keys_by_type[interaction_type_name]
+                for interaction in coll:
+                    if interaction.tag != singular:
+                        continue
                     data = {**site_info, 'interaction_type': interaction_type_name}
                     for child in interaction:
                         if child.text and child.text.strip():
@@ -1306,162 +2426,221 @@ def parse_plip_xml(xml_path, output_dir):
                                     data[f"{child.tag}_{subchild.tag}"] = subchild.text.strip()
                     all_interactions.append(data)
                     interactions_by_type[interaction_type_name].append(data)
+                    type_keys.update(data)
+            _release(bindingsite)
+        
+        if collect is not None:
+            collect.extend(all_interactions)
         
         if all_interactions:
             csv_path = os.path.join(output_dir, 'interactions_all.csv')
-            preferred_order = [
-                'interaction_type', 'dist', 'dist_d-a', 'dist_h-a', 'don_angle', 'donoridx',
-                'donortype', 'restype', 'resnr', 'acceptoridx', 'acceptortype',
-            ]
-            all_keys = sorted(set(k for d in all_interactions for k in d.keys()))
-            ordered_keys = [k for k in preferred_order if k in all_keys] + \
-                           [k for k in all_keys if k not in preferred_order]
-            keys = ordered_keys
-
-            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=keys)
-                writer.writeheader()
-                writer.writerows(all_interactions)
+            # Column sets were gathered while parsing; no second scan over the rows
+            all_keys = set().union(*keys_by_type.values())
+            ordered_keys = [k for k in _PREFERRED_ORDER if k in all_keys] + \
+                           sorted(all_keys.difference(_PREFERRED_ORDER))
+            # Serialize everything here, then hand the writes to a thread pool
+            outputs = [(csv_path, _csv_bytes(
+                ordered_keys, [[d.get(k, '') for k in ordered_keys] for d in all_interactions]
+            ))]
             
             for itype, interactions in interactions_by_type.items():
                 if not interactions:
                     continue
                 filename = f"{itype.replace(' ', '_')}.csv"
-                with open(os.path.join(output_dir, filename), 'w', newline='', encoding='utf-8') as f:
-                    type_keys = sorted(set(k for d in interactions for k in d.keys()))
-                    writer = csv.DictWriter(f, fieldnames=type_keys)
-                    writer.writeheader()
-                    writer.writerows(interactions)
+                type_keys = sorted(keys_by_type[itype])
+                outputs.append((os.path.join(output_dir, filename), _csv_bytes(
+                    type_keys, [[d.get(k, '') for k in type_keys] for d in interactions]
+                )))
             
-            with open(os.path.join(output_dir, 'interactions_all.json'), 'w') as f:
-                json.dump(all_interactions, f, indent=2)
+            outputs.append((
+                os.path.join(output_dir, 'interactions_all.json'),
+                json_bytes(all_interactions, indent=True),
+            ))
             
             for itype, interactions in interactions_by_type.items():
                 if not interactions:
                     continue
                 filename = f"{itype.replace(' ', '_')}.json"
-                with open(os.path.join(output_dir, filename), 'w') as f:
-                    json.dump(interactions, f, indent=2)
+                outputs.append((
+                    os.path.join(output_dir, filename),
+                    json_bytes(interactions, indent=True),
+                ))
             
             summary_path = os.path.join(output_dir, 'interaction_summary.csv')
             counts = {}
             for i in all_interactions:
                 itype = i.get('interaction_type', 'Unknown')
                 counts[itype] = counts.get(itype, 0) + 1
-            with open(summary_path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Interaction Type', 'Count'])
-                for itype, count in sorted(counts.items()):
-                    writer.writerow([itype, count])
+            outputs.append((summary_path, _csv_bytes(
+                ['Interaction Type', 'Count'], sorted(counts.items())
+            )))
+            
+            write_outputs(outputs)
             return True
         return False
     except Exception as e:
-        print(f"Error parsing XML: {e}")
+        LOG.error(f"Error parsing XML: {e}")
         return False
 
 # ============================================================================
 # MAIN PROCESSING - Single receptor-ligand pair
 # ============================================================================
 
-def main():
+# Per-pose output listings reported back, in this key order
+_OUTPUT_EXTS = ("csv", "json", "png", "xml", "txt", "pse", "pml", "pdb", "pdbqt")
+
+def process_pose(i, n_poses, pose_file, pose_dir, merge_path, complex_path, receptor_path, converted=False):
+    """Convert and PLIP-analyze one merged pose in its (already created) pose_{i} folder.
+    All paths come precomputed from main. Returns (result dict, parsed interaction rows or None)."""
+    LOG.info(f"\\n  🎯 Processing pose {i}/{n_poses}...")
+    
+    # Convert to PDB format, unless the batched obabel run already did
+    if DIRECT_PDB:
+        write_complex_pdb(receptor_path, pose_file, complex_path)
+    else:
+        if not converted:
+            convert_to_pdb(merge_path, complex_path, cwd=pose_dir)
+        
+        # Remove SMILES from PDB
+        LOG.info(f"    Cleaning SMILES from complex.pdb...")
+        remove_smiles_from_pdb(complex_path)
+    
+    # Run PLIP analysis
+    rows = None
+    try:
+        cached_run_plip(complex_path, pose_dir)
+        xml_path = os.path.join(pose_dir, "report.xml")
+        if os.path.exists(xml_path):
+            rows = []
+            parse_plip_xml(xml_path, pose_dir, collect=rows)
+            LOG.info(f"    ✓ Pose {i} completed")
+        else:
+            LOG.warning(f"    ⚠ Pose {i}: No XML output")
+    except Exception as e:
+        LOG.warning(f"    ✗ Pose {i} failed: {e}")
+    
+    # Collect output files, bucketed by extension in one directory pass
+    result = {"pose": i, "folder": pose_dir}
+    buckets = {ext: [] for ext in _OUTPUT_EXTS}
+    with os.scandir(pose_dir) as it:
+        for entry in it:
+            base, dot, ext = entry.name.rpartition('.')
+            bucket = buckets.get(ext) if dot else None
+            if bucket is not None:
+                bucket.append(entry.name)
+    for ext, names in buckets.items():
+        result[f"{ext}_files"] = names
+    return result, rows
+
+def run_analysis(log_queue):
     receptor_path = os.environ.get('RECEPTOR_PATH')
     ligand_path = os.environ.get('LIGAND_PATH')
     output_dir = os.environ.get('OUTPUT_DIR')
     max_poses = int(os.environ.get('MAX_POSES', 5))
+    max_workers = int(os.environ.get('MAX_WORKERS', DEFAULT_MAX_WORKERS))
+    
+    receptor_name = os.path.basename(receptor_path)
+    ligand_name = os.path.basename(ligand_path)
+    db_path = os.path.join(output_dir, "interactions.db")
     
-    print(f"🔬 PLIP Analysis Starting...")
-    print(f"  Receptor: {os.path.basename(receptor_path)}")
-    print(f"  Ligand: {os.path.basename(ligand_path)}")
-    print(f"  Output: {output_dir}")
-    print(f"  Max poses: {max_poses}")
+    LOG.info(f"🔬 PLIP Analysis Starting...")
+    LOG.info(f"  Receptor: {receptor_name}")
+    LOG.info(f"  Ligand: {ligand_name}")
+    LOG.info(f"  Output: {output_dir}")
+    LOG.info(f"  Max poses: {max_poses}")
+    LOG.info(f"  Workers: {max_workers}")
+    if PLIP_CACHE_DIR:
+        LOG.info(f"  PLIP cache: {PLIP_CACHE_DIR} (up to {PLIP_CACHE_MAX_BYTES >> 20} MiB)")
     
     # Original files already copied by local backend
     # Just verify they exist
     original_files_dir = os.path.join(output_dir, "original_files")
     if os.path.exists(original_files_dir):
-        print(f"  ✓ Original files preserved in: {original_files_dir}")
+        LOG.info(f"  ✓ Original files preserved in: {original_files_dir}")
     
     # Split ligand file into individual poses
-    poses_root = os.path.join(output_dir, "poses")
-    os.makedirs(poses_root, exist_ok=True)
-    all_pose_files = split_pdbqt_models(ligand_path, poses_root)
+    out = Path(output_dir)
+    poses_root = out / "poses"
+    poses_root.mkdir(exist_ok=True)
+    selected_poses, total_poses = split_pdbqt_models(ligand_path, poses_root, limit=max_poses)
     
-    total_poses = len(all_pose_files)
-    selected_poses = all_pose_files[:max_poses]
+    LOG.info(f"  Total poses in ligand: {total_poses}")
+    LOG.info(f"  Analyzing first {len(selected_poses)} pose(s)")
     
-    print(f"  Total poses in ligand: {total_poses}")
-    print(f"  Analyzing first {len(selected_poses)} pose(s)")
-    
-    # Remove excess pose files
-    for pose_file in all_pose_files[max_poses:]:
-        try:
-            os.remove(pose_file)
-        except:
-            pass
+    # Merge receptor and ligand for every pose and convert them all in one obabel run;
+    # the direct PDB writer reads the pose files itself and needs neither step
+    # Pose folders are built and created once (one mkdir each) and handed to the workers
+    pose_dirs = [out / f"pose_{i}" for i in range(1, len(selected_poses) + 1)]
+    for d in pose_dirs:
+        d.mkdir(exist_ok=True)
+    pose_dirs = [str(d) for d in pose_dirs]
+    complex_paths = [os.path.join(d, "complex.pdb") for d in pose_dirs]
+    if DIRECT_PDB:
+        merge_paths = [None] * len(pose_dirs)
+    else:
+        merge_paths = [os.path.join(d, f"merge_{i}.pdbqt") for i, d in enumerate(pose_dirs, start=1)]
+        for pose_file, merge_path in zip(selected_poses, merge_paths):
+            merge_pdbqt(receptor_path, pose_file, merge_path)
+    # With the Open Babel bindings each worker converts its own pose in-process instead
+    converted = not DIRECT_PDB and pybel is None and bool(selected_poses) and convert_merged_batch(merge_paths, complex_paths, output_dir)
     
-    # Process each pose
+    # Poses are independent (conversion, SMILES cleanup, PLIP): run them side by side
+    # The receptor is read here first, so forked workers inherit it in _REC_CACHE
+    rows_by_pose = {}
     pose_results = []
-    for i, pose_file in enumerate(selected_poses, start=1):
-        print(f"\\n  🎯 Processing pose {i}/{len(selected_poses)}...")
-        pose_dir = os.path.join(output_dir, f"pose_{i}")
-        os.makedirs(pose_dir, exist_ok=True)
-        
-        merge_path = os.path.join(pose_dir, f"merge_{i}.pdbqt")
-        complex_path = os.path.join(pose_dir, "complex.pdb")
-        
-        # Merge receptor and ligand
-        merge_pdbqt(receptor_path, pose_file, merge_path)
-        
-        # Convert to PDB format
-        safe_run(["obabel", merge_path, "-O", complex_path], cwd=pose_dir)
-        
-        # Remove SMILES from PDB
-        print(f"    Cleaning SMILES from complex.pdb...")
-        remove_smiles_from_pdb(complex_path)
-        
-        # Run PLIP analysis
-        plip_cmd = ["plip", "-f", complex_path, "-x", "-t", "-y", "--nohydro", "--nofixfile", "--nofix"]
-        try:
-            safe_run(plip_cmd, cwd=pose_dir)
-            xml_path = os.path.join(pose_dir, "report.xml")
-            if os.path.exists(xml_path):
-                parse_plip_xml(xml_path, pose_dir)
-                print(f"    ✓ Pose {i} completed")
-            else:
-                print(f"    ⚠ Pose {i}: No XML output")
-        except Exception as e:
-            print(f"    ✗ Pose {i} failed: {e}")
-        
-        # Collect output files
-        files = os.listdir(pose_dir)
-        pose_results.append({
-            "pose": i,
-            "folder": pose_dir,
-            "csv_files": [f for f in files if f.endswith('.csv')],
-            "json_files": [f for f in files if f.endswith('.json')],
-            "png_files": [f for f in files if f.endswith('.png')],
-            "xml_files": [f for f in files if f.endswith('.xml')],
-            "txt_files": [f for f in files if f.endswith('.txt')],
-            "pse_files": [f for f in files if f.endswith('.pse')],
-            "pml_files": [f for f in files if f.endswith('.pml')],
-            "pdb_files": [f for f in files if f.endswith('.pdb')],
-            "pdbqt_files": [f for f in files if f.endswith('.pdbqt')],
-        })
+    _rec_bytes(receptor_path)
+    with ProcessPoolExecutor(
+        max_workers=max(1, max_workers),
+        initializer=init_worker,
+        initargs=(log_queue,),
+    ) as ex:
+        futures = [
+            ex.submit(
+                process_pose, i, len(selected_poses), pose_file,
+                pose_dirs[i - 1], merge_paths[i - 1], complex_paths[i - 1], receptor_path, converted,
+            )
+            for i, pose_file in enumerate(selected_poses, start=1)
+        ]
+        for fut in as_completed(futures):
+            result, rows = fut.result()
+            pose_results.append(result)
+            rows_by_pose[result["pose"]] = rows
+    pose_results.sort(key=lambda r: r["pose"])
+    
+    db = open_interactions_db(db_path)
+    for pose_id, rows in sorted(rows_by_pose.items()):
+        if rows is not None:
+            store_interactions(db, pose_id, rows)
+    db.close()
     
     # Output results as JSON
     output = {
         "total_poses_in_file": total_poses,
         "poses_analyzed": len(selected_poses),
+        "interactions_db": db_path,
         "poses": pose_results
     }
     
-    print(f"\\n  ✅ Analysis complete!")
-    print(json.dumps(output))
+    LOG.info(f"\\n  ✅ Analysis complete!")
+    return output
+
+def main():
+    log_queue = mp.Queue()
+    listener = QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    log_to(log_queue)
+    listener.start()
+    try:
+        output = run_analysis(log_queue)
+    finally:
+        listener.stop()
+    sys.stdout.flush()
+    sys.stdout.buffer.write(json_bytes(output) + b"\\n")
+    sys.stdout.buffer.flush()
 
 if __name__ == "__main__":
     main()
 '''
-    return script
+    return script.replace("__MAX_WORKERS__", str(max_workers))
 
 
 @router.post("/plip/submit-job")
@@ -1496,7 +2675,7 @@ async def plip_submit_job(
     
     try:
         LOG.info("[PLIP] Sending script to local backend...")
-        response = requests.post(
+        response = await _plip_client.post(
             f"{local_backend_url}/execute-job",
             data={
                 "script": script,
@@ -1506,8 +2685,7 @@ async def plip_submit_job(
                 "max_poses": max_poses,
                 "max_workers": max_workers,
                 "config": str(config)
-            },
-            timeout=10000
+            }
         )
         
         if response.status_code != 200:
@@ -1515,20 +2693,19 @@ async def plip_submit_job(
             raise HTTPException(response.status_code, f"Local backend error: {response.text}")
         
         result = response.json()
-        LOG.info(f"[PLIP] ✅ Job completed!")
-        LOG.info(f"  Job ID: {result.get('job_id')}")
-        LOG.info(f"  Total combinations: {result.get('total_combinations')}")
-        LOG.info(f"  Successful: {result.get('successful')}")
-        LOG.info(f"  Failed: {result.get('failed')}")
-        LOG.info(f"  Execution time: {result.get('execution_time_seconds')}s")
+        LOG.info(
+            "[PLIP] ✅ Job completed! Job ID: %s, combinations: %s, successful: %s, failed: %s, time: %ss",
+            result.get('job_id'), result.get('total_combinations'), result.get('successful'),
+            result.get('failed'), result.get('execution_time_seconds'),
+        )
         
         return result
         
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         raise HTTPException(502, 
             f"Cannot connect to local backend at {local_backend_url}. "
             "Make sure it's running on your machine.")
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         raise HTTPException(504, "Job timed out")
     except Exception as e:
         LOG.exception("[PLIP] Error")
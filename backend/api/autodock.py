@@ -1,6 +1,9 @@
 # backend/api/autodock.py
 
+import asyncio
+import json
 import os
+import shutil
 import uuid
 import subprocess
 from fastapi import APIRouter, UploadFile, File
@@ -12,6 +15,112 @@ router = APIRouter(prefix="/autodock", tags=["AutoDock Tools"])
 PREPARE_LIGAND = "/home/naji/miniconda3/bin/prepare_ligand4.py"
 PREPARE_RECEPTOR = "/home/naji/miniconda3/bin/prepare_receptor4.py"
 
+# Long-lived interpreters that run the prepare scripts, so MGLTools is imported
+# once per worker instead of on every request. One JSON line [script, argv] in,
+# one JSON line [returncode, stderr] out; the protocol uses a private copy of
+# stdout and anything the scripts print goes to stderr.
+# Each job runs in a fork of the warm worker: it inherits the imported modules
+# but none of the globals a previous run_path left behind, and a crash or a
+# stray os._exit only takes down that one job.
+_WORKER_SRC = r"""
+import contextlib, io, json, os, runpy, sys, traceback
+proto = os.fdopen(os.dup(1), "w")
+os.dup2(2, 1)
+for mod in ("MolKit", "AutoDockTools", "AutoDockTools.MoleculePreparation"):
+    try:
+        __import__(mod)
+    except Exception:
+        pass
+
+def run(script, args, out):
+    sys.argv = [script] + args
+    script_dir = os.path.dirname(script)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    err = io.StringIO()
+    code = 0
+    try:
+        with contextlib.redirect_stdout(sys.stderr), contextlib.redirect_stderr(err):
+            runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if e.code is not None and not isinstance(e.code, int):
+            err.write(str(e.code))
+    except BaseException:
+        err.write(traceback.format_exc())
+        code = 1
+    out.write(json.dumps([code, err.getvalue()]))
+
+for line in sys.stdin:
+    script, args = json.loads(line)
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        with os.fdopen(w, "w") as out:
+            run(script, args, out)
+        os._exit(0)
+    os.close(w)
+    with os.fdopen(r) as res:
+        reply = res.read()
+    _, status = os.waitpid(pid, 0)
+    if not reply:
+        code = os.waitstatus_to_exitcode(status)
+        reply = json.dumps([code or 1, "prepare script exited without a result (code %d)" % code])
+    proto.write(reply + "\n")
+    proto.flush()
+"""
+
+# A few workers so independent requests don't queue behind one another; each
+# worker handles one job at a time.
+ADT_WORKERS = max(1, int(os.environ.get("ADT_WORKERS", min(4, os.cpu_count() or 1))))
+_idle_workers: list = []
+_worker_slots = asyncio.Semaphore(ADT_WORKERS)
+
+
+async def _spawn_worker() -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        "python3", "-u", "-c", _WORKER_SRC,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+    )
+
+
+async def run_prepare_script(script: str, args: list) -> tuple:
+    """Run an MGLTools prepare script; returns (returncode, stderr)."""
+    async with _worker_slots:
+        worker = None
+        while _idle_workers and worker is None:
+            w = _idle_workers.pop()
+            if w.returncode is None:
+                worker = w
+        try:
+            if worker is None:
+                worker = await _spawn_worker()
+            worker.stdin.write((json.dumps([script, args]) + "\n").encode())
+            await worker.stdin.drain()
+            line = await worker.stdout.readline()
+            if line:
+                code, err = json.loads(line)
+                _idle_workers.append(worker)
+                return code, err
+        except (OSError, ValueError):
+            pass
+        except BaseException:
+            # Cancelled (or failed) mid-exchange: the reply may still arrive on
+            # this pipe, so the worker must never serve another request.
+            if worker is not None and worker.returncode is None:
+                worker.kill()
+            raise
+        if worker is not None and worker.returncode is None:
+            worker.kill()
+
+    # Worker died or is unusable: fall back to a one-off interpreter
+    proc = await asyncio.create_subprocess_exec(
+        "python3", script, *args, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    _, err = await proc.communicate()
+    return proc.returncode, err.decode()
+
 
 def save_temp_file(upload: UploadFile, suffix=""):
     """Store upload to temp folder and return its path."""
@@ -19,8 +128,9 @@ def save_temp_file(upload: UploadFile, suffix=""):
     rnd = uuid.uuid4().hex
     outpath = f"/tmp/{rnd}{suffix}{ext}"
 
+    upload.file.seek(0)
     with open(outpath, "wb") as f:
-        f.write(upload.file.read())
+        shutil.copyfileobj(upload.file, f, length=1 << 20)
 
     return outpath
 
@@ -31,19 +141,10 @@ async def prepare_ligand(file: UploadFile = File(...)):
     src = save_temp_file(file)
     out = src.replace(".pdb", ".pdbqt").replace(".mol2", ".pdbqt").replace(".sdf", ".pdbqt")
 
-    cmd = [
-        "python3",
-        PREPARE_LIGAND,
-        "-l", src,
-        "-o", out,
-        "-A", "hydrogens"
-    ]
-
-    try:
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return FileResponse(out, filename=os.path.basename(out))
-    except subprocess.CalledProcessError as e:
-        return {"error": e.stderr.decode()}
+    code, err = await run_prepare_script(PREPARE_LIGAND, ["-l", src, "-o", out, "-A", "hydrogens"])
+    if code != 0:
+        return {"error": err}
+    return FileResponse(out, filename=os.path.basename(out))
 
 
 @router.post("/receptor")
@@ -52,17 +153,8 @@ async def prepare_receptor(file: UploadFile = File(...)):
     src = save_temp_file(file)
     out = src.replace(".pdb", ".pdbqt").replace(".mol2", ".pdbqt").replace(".sdf", ".pdbqt")
 
-    cmd = [
-        "python3",
-        PREPARE_RECEPTOR,
-        "-r", src,
-        "-o", out,
-        "-A", "hydrogens"
-    ]
-
-    try:
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return FileResponse(out, filename=os.path.basename(out))
-    except subprocess.CalledProcessError as e:
-        return {"error": e.stderr.decode()}
+    code, err = await run_prepare_script(PREPARE_RECEPTOR, ["-r", src, "-o", out, "-A", "hydrogens"])
+    if code != 0:
+        return {"error": err}
+    return FileResponse(out, filename=os.path.basename(out))
 
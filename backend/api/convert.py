@@ -1,6 +1,7 @@
 from fastapi import APIRouter, UploadFile, File, Form
 from fastapi.responses import JSONResponse
 import subprocess, os, tempfile
+from utils.uploads import write_upload
 
 router = APIRouter()
 
@@ -14,8 +15,7 @@ async def convert_to_pdbqt(file: UploadFile = File(...), base_path: str = Form(.
         input_path = os.path.join(tempfile.gettempdir(), file.filename)
         output_path = os.path.join(base_path, os.path.splitext(file.filename)[0] + ".pdbqt")
 
-        with open(input_path, "wb") as f:
-            f.write(await file.read())
+        await write_upload(file, input_path)
 
         cmd = ["obabel", input_path, "-O", output_path]
         subprocess.run(cmd, check=True)
@@ -1,4 +1,7 @@
 # api/dependencies.py
+import functools
+import importlib
+import importlib.util
 import platform
 import shutil
 import subprocess
@@ -24,14 +27,28 @@ TOOLS = {
     "python_libs": {"desc": "Python packages (numpy, pandas, ...)"}
 }
 
+# PATH / import lookups are memoized: the frontend polls /check-dependencies, and
+# the answers only change when an install finishes (see installer_thread)
+@functools.lru_cache(maxsize=None)
+def _which(bin_name):
+    return shutil.which(bin_name)
+
+@functools.lru_cache(maxsize=None)
+def _find_spec(pkg):
+    return importlib.util.find_spec(pkg)
+
+def _invalidate_which_cache():
+    _which.cache_clear()
+    _find_spec.cache_clear()
+    importlib.invalidate_caches()
+
 # Helper: detect binary on PATH
 def is_binary_available(bin_name):
-    return shutil.which(bin_name) is not None
+    return _which(bin_name) is not None
 
 # Helper: detect python packages
 def is_python_package_installed(pkg):
-    import importlib.util
-    return importlib.util.find_spec(pkg) is not None
+    return _find_spec(pkg) is not None
 
 # Check dependencies endpoint
 @router.get("/check-dependencies")
@@ -98,6 +115,13 @@ def _run_and_log(cmd, job_id):
 
 # Background installer per-OS simple best-effort
 def installer_thread(tool_name, job_id):
+    try:
+        _install_tool(tool_name, job_id)
+    finally:
+        # Whatever the outcome, PATH and site-packages may have changed
+        _invalidate_which_cache()
+
+def _install_tool(tool_name, job_id):
     job = INSTALL_JOBS[job_id]
     os_name = platform.system().lower()
     log_path = job["log_path"]
@@ -106,7 +130,7 @@ def installer_thread(tool_name, job_id):
     if os_name == "linux":
         if tool_name == "openbabel":
             # try apt-get
-            if shutil.which("apt-get"):
+            if _which("apt-get"):
                 cmd = "sudo apt-get update && sudo apt-get install -y openbabel"
                 _run_and_log(cmd, job_id)
                 return
@@ -117,7 +141,7 @@ def installer_thread(tool_name, job_id):
                 return
 
         if tool_name == "vina":
-            if shutil.which("apt-get"):
+            if _which("apt-get"):
                 # some distros package name is 'autodock-vina' or 'vina'
                 cmd = "sudo apt-get update && sudo apt-get install -y autodock-vina"
                 _run_and_log(cmd, job_id)
@@ -139,7 +163,7 @@ def installer_thread(tool_name, job_id):
 
         if tool_name == "python_libs":
             # pip install needed packages
-            cmd = f"{shutil.which('python3') or shutil.which('python')} -m pip install numpy pandas"
+            cmd = f"{_which('python3') or _which('python')} -m pip install numpy pandas"
             _run_and_log(cmd, job_id)
             return
 
@@ -147,7 +171,7 @@ def installer_thread(tool_name, job_id):
     if os_name == "darwin":
         # require brew
         if tool_name in ("openbabel", "vina"):
-            if shutil.which("brew"):
+            if _which("brew"):
                 pkg = "open-babel" if tool_name == "openbabel" else "autodock-vina"
                 cmd = f"brew install {pkg}"
                 _run_and_log(cmd, job_id)
@@ -163,7 +187,7 @@ def installer_thread(tool_name, job_id):
             job["status"] = "failed"
             return
         if tool_name == "python_libs":
-            cmd = f"{shutil.which('python3') or 'python3'} -m pip install numpy pandas"
+            cmd = f"{_which('python3') or 'python3'} -m pip install numpy pandas"
             _run_and_log(cmd, job_id)
             return
 
@@ -172,7 +196,7 @@ def installer_thread(tool_name, job_id):
         # prefer winget, else choco, else instruct
         if tool_name in ("openbabel", "vina"):
             installer = None
-            if shutil.which("winget"):
+            if _which("winget"):
                 # winget identifiers vary; users may need to adapt
                 if tool_name == "openbabel":
                     cmd = "winget install --id OpenBabel.OpenBabel -e --source winget"
@@ -181,7 +205,7 @@ def installer_thread(tool_name, job_id):
                     cmd = "winget install --id Autodock.Vina -e --source winget"
                 _run_and_log(cmd, job_id)
                 return
-            if shutil.which("choco"):
+            if _which("choco"):
                 if tool_name == "openbabel":
                     _run_and_log("choco install openbabel -y", job_id)
                     return
@@ -200,7 +224,7 @@ def installer_thread(tool_name, job_id):
             return
 
         if tool_name == "python_libs":
-            py = shutil.which("python") or shutil.which("python3")
+            py = _which("python") or _which("python3")
             if py:
                 _run_and_log(f"{py} -m pip install numpy pandas", job_id)
                 return
@@ -128,6 +128,29 @@ async def generate_script_text(
 
     return {"script_text": script_text}
 # ---------- Existing: calculate-blind-box ----------
+def _atom_coords(lines) -> np.ndarray:
+    """(N, 3) x/y/z of the ATOM/HETATM records, parsed column-wise by NumPy.
+
+    The fixed-width 30:54 slice of every record is viewed as three 8-char
+    fields and converted in one call; if any record is malformed we fall back
+    to per-line parsing so bad atoms are skipped as before.
+    """
+    cols = [line[30:54] for line in lines if line.startswith(("ATOM", "HETATM"))]
+    if not cols:
+        return np.empty((0, 3))
+    try:
+        return np.array(cols, dtype="U24").view("U8").reshape(-1, 3).astype(float)
+    except ValueError:
+        pass
+    rows = []
+    for c in cols:
+        try:
+            rows.append((float(c[0:8]), float(c[8:16]), float(c[16:24])))
+        except ValueError:
+            continue
+    return np.array(rows, dtype=float).reshape(-1, 3)
+
+
 # Line ~98 in docking.py - REPLACE the entire calculate-blind-box function:
 
 @router.post("/calculate-blind-box")
@@ -144,17 +167,7 @@ async def calculate_blind_docking_box(
         print(f"📁 Processing {len(receptor_files)} uploaded receptor file(s)")
         for file in receptor_files:
             content = await file.read()
-            lines = content.decode().splitlines()
-
-            for line in lines:
-                if line.startswith(("ATOM", "HETATM")):
-                    try:
-                        x = float(line[30:38])
-                        y = float(line[38:46])
-                        z = float(line[46:54])
-                        all_coords.append([x, y, z])
-                    except:
-                        continue
+            all_coords.append(_atom_coords(content.decode().splitlines()))
 
     # CASE 2: Path was provided (user typed it manually)
     elif receptor_path:
@@ -187,16 +200,7 @@ async def calculate_blind_docking_box(
         for filepath in files_to_process:
             try:
                 with open(filepath, 'r') as f:
-                    lines = f.readlines()
-                    for line in lines:
-                        if line.startswith(("ATOM", "HETATM")):
-                            try:
-                                x = float(line[30:38])
-                                y = float(line[38:46])
-                                z = float(line[46:54])
-                                all_coords.append([x, y, z])
-                            except:
-                                continue
+                    all_coords.append(_atom_coords(f))
             except Exception as e:
                 print(f"⚠️ Warning: Could not read {filepath}: {e}")
                 continue
@@ -204,11 +208,10 @@ async def calculate_blind_docking_box(
     else:
         raise HTTPException(status_code=400, detail="Either receptor_files or receptor_path must be provided")
 
-    if not all_coords:
+    coords = np.concatenate(all_coords) if all_coords else np.empty((0, 3))
+    if not len(coords):
         raise HTTPException(status_code=400, detail="No atom coordinates found in receptor(s)")
 
-    coords = np.array(all_coords)
-
     # Compute bounds
     min_coords = coords.min(axis=0)
     max_coords = coords.max(axis=0)
@@ -220,7 +223,7 @@ async def calculate_blind_docking_box(
     padding = 5.0  # Å
     size = (max_coords - min_coords) + (2 * padding)
 
-    print(f"✅ Blind box calculated from {len(all_coords)} atoms")
+    print(f"✅ Blind box calculated from {len(coords)} atoms")
     print(f"   Center: ({center[0]:.2f}, {center[1]:.2f}, {center[2]:.2f})")
     print(f"   Size: ({size[0]:.2f}, {size[1]:.2f}, {size[2]:.2f})")
 
@@ -1,9 +1,9 @@
 # backend/api/file_upload.py
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
 from utils.file_converter import convert_to_pdbqt
+from utils.uploads import write_upload
 from fastapi.responses import FileResponse
 import os
-import shutil
 
 
 
@@ -28,8 +28,7 @@ async def upload_file(
     os.makedirs(save_dir, exist_ok=True)
 
     file_path = os.path.join(save_dir, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    await write_upload(file, file_path)
 
     # Convert to .pdbqt if needed
     converted_path = file_path
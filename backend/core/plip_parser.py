@@ -1,6 +1,10 @@
 # core/plip_parser.py
 
-import xml.etree.ElementTree as ET
+try:
+    # C parser and XPath engine; same find/findall/attrib API as ElementTree
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
 
 def parse_xml_file(xml_path: str) -> dict:
     """
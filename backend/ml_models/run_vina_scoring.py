@@ -2,10 +2,13 @@ import argparse
 import os
 import re
 
+# First row of the Vina results table: "   1   -7.5 ..."
+_TOP_MODE_RE = re.compile(r"\s*1\s+-?\d+\.\d+")
+
 def extract_from_log(txt_file):
     with open(txt_file, "r") as f:
         for line in f:
-            if re.match(r"\s*1\s+-?\d+\.\d+", line):
+            if _TOP_MODE_RE.match(line):
                 return float(line.split()[1])
     return None
 
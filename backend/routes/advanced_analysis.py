@@ -2,12 +2,14 @@ from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Form
 from fastapi.responses import FileResponse
 from pathlib import Path
 from urllib.parse import unquote
-import shutil, uuid, subprocess
+import asyncio
+import uuid, subprocess
 # import pymol2 
 from pydantic import BaseModel
 import os
 from core.plip_runner import run_plip_batch
 from core.plip_parser import parse_xml_file
+from utils.uploads import write_upload
 
 
 from core.plip_runner import run_plip_batch
@@ -193,13 +195,15 @@ async def run_plip_analysis(
         temp_dir.mkdir(exist_ok=True)
         ligand_path = temp_dir / f"{uuid.uuid4()}_{ligand.filename}"
         receptor_path = temp_dir / f"{uuid.uuid4()}_{receptor.filename}"
-        with open(ligand_path, "wb") as f:
-            shutil.copyfileobj(ligand.file, f)
-        with open(receptor_path, "wb") as f:
-            shutil.copyfileobj(receptor.file, f)
+        await asyncio.gather(
+            write_upload(ligand, ligand_path),
+            write_upload(receptor, receptor_path),
+        )
 
         from core.plip_runner import run_plip
-        xml_report = run_plip(
+        # PLIP runs for seconds to minutes; keep it off the event loop
+        xml_report = await asyncio.to_thread(
+            run_plip,
             receptor_path=str(receptor_path),
             ligand_path=str(ligand_path),
             output_folder=output_folder
@@ -221,11 +225,11 @@ async def run_vsframework_script(script: UploadFile = File(...)):
     unique_name = f"{uuid.uuid4()}_{script.filename}"
     script_path = tmp_dir / unique_name
 
-    content = await script.read()
-    script_path.write_bytes(content)
+    await write_upload(script, script_path)
 
     try:
-        result = subprocess.run(
+        result = await asyncio.to_thread(
+            subprocess.run,
             ["python3", str(script_path)],
             capture_output=True,
             text=True,
@@ -85,6 +85,7 @@ Installation:
 """
 
 import os
+import re
 import sys
 import tempfile
 import shutil
@@ -96,6 +97,11 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 import xml.etree.ElementTree as ET
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # ============================================================================
 # CONFIGURATION - User Parameters
 # ============================================================================
@@ -187,114 +193,153 @@ def safe_run(cmd, cwd=None):
     return p.stdout
 
 
-def remove_smiles_from_pdb(pdb_path):
-    """Remove SMILES strings from PDB file"""
+_PDB_KW = ("ATOM", "HETATM", "TER", "END", "MODEL", "ENDMDL", "CONECT", "REMARK", "HEADER", "TITLE", "CRYST")
+# "SMILES..." / "smiles:..." line prefixes and stereo-centre tokens, in one C-level scan per line
+_SMILES_RE = re.compile(r"^\\s*(?:SMILES|(?i:smiles:))|\\[C@@?H\\]|\\[@")
+
+def _is_smiles_line(line):
+    """True for SMILES text obabel leaves in a PDB: a SMILES prefix or stereo token,
+    or a long, bracket-heavy single token on a line that isn't a PDB record"""
+    if _SMILES_RE.search(line):
+        return True
+    if line.startswith(_PDB_KW):
+        return False
+    stripped = line.strip()
+    return (len(stripped) > 50 and not stripped.startswith(_PDB_KW)
+            and stripped.count("(") + stripped.count("[") > 5 and stripped.count(" ") < 3)
+
+def clean_complex_pdb(pdb_path):
+    """Remove SMILES lines and add chain IDs in a single streaming pass"""
     temp_path = pdb_path + ".tmp"
     lines_removed = 0
-    
+    lines_modified = 0
+
     try:
         with open(pdb_path, "r") as infile, open(temp_path, "w") as outfile:
             for line in infile:
-                stripped = line.strip()
-                is_smiles = False
-                
-                if stripped.startswith("SMILES") or stripped.lower().startswith("smiles:"):
-                    is_smiles = True
-                elif "[C@@H]" in line or "[C@H]" in line or "[@" in line:
-                    is_smiles = True
-                elif stripped and not stripped.startswith(("ATOM", "HETATM", "TER", "END", 
-                                                          "MODEL", "ENDMDL", "CONECT", 
-                                                          "REMARK", "HEADER", "TITLE", "CRYST")):
-                    if len(stripped) > 50 and stripped.count("(") + stripped.count("[") > 5 and stripped.count(" ") < 3:
-                        is_smiles = True
-                
-                if is_smiles:
+                if _is_smiles_line(line):
                     lines_removed += 1
                     continue
-                    
+                # Blank chain on ATOM -> A, on HETATM -> B
+                if line[21:22] == ' ' and line.startswith(("ATOM  ", "HETATM")):
+                    line = f"{{line[:21]}}{{'A' if line[0] == 'A' else 'B'}}{{line[22:]}}"
+                    lines_modified += 1
                 outfile.write(line)
-        
+
         shutil.move(temp_path, pdb_path)
-        
+
         if lines_removed > 0:
             print(f"    ✓ Removed {{lines_removed}} SMILES lines from PDB")
-        
-        return True
-    except Exception as e:
-        print(f"    ⚠ Warning: Could not clean SMILES from PDB: {{e}}")
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        return False
-
-def add_chain_ids_to_pdb(pdb_path):
-    """Add chain identifiers to PDB file"""
-    temp_path = pdb_path + ".tmp"
-    lines_modified = 0
-    
-    try:
-        with open(pdb_path, "r") as infile, open(temp_path, "w") as outfile:
-            for line in infile:
-                if line.startswith("ATOM  "):
-                    if len(line) > 21 and line[21] == ' ':
-                        modified_line = line[:21] + 'A' + line[22:]
-                        outfile.write(modified_line)
-                        lines_modified += 1
-                    else:
-                        outfile.write(line)
-                elif line.startswith("HETATM"):
-                    if len(line) > 21 and line[21] == ' ':
-                        modified_line = line[:21] + 'B' + line[22:]
-                        outfile.write(modified_line)
-                        lines_modified += 1
-                    else:
-                        outfile.write(line)
-                else:
-                    outfile.write(line)
-        
-        shutil.move(temp_path, pdb_path)
-        
         if lines_modified > 0:
             print(f"      ✓ Added chain IDs to {{lines_modified}} atoms")
-        
+
         return True
     except Exception as e:
-        print(f"      ⚠ Warning: Could not add chain IDs: {{e}}")
+        print(f"    ⚠ Warning: Could not clean complex PDB: {{e}}")
         if os.path.exists(temp_path):
             os.remove(temp_path)
         return False
 
 def split_pdbqt_models(src, out_dir):
-    """Split multi-model PDBQT into individual pose files"""
+    """Split multi-model PDBQT into individual pose files.
+    Model lines are streamed straight into the open pose file; only lines outside a
+    MODEL block are held back, since trailing ones form a last pose of their own."""
     poses = []
-    model = []
-    idx = 0
-    with open(src, "r") as f:
+    stray = []
+    o = None
+    with open(src, "rb") as f:
         for line in f:
-            if line.startswith("MODEL"):
-                model = []
-            model.append(line)
-            if line.startswith("ENDMDL"):
-                idx += 1
-                out = os.path.join(out_dir, f"pose_{{idx}}.pdbqt")
-                with open(out, "w") as o:
-                    o.writelines(model)
+            if line.startswith(b"MODEL"):
+                stray = []
+                if o is None:
+                    out = os.path.join(out_dir, f"pose_{{len(poses) + 1}}.pdbqt")
+                    o = open(out, "wb", buffering=1 << 20)
+                else:  # MODEL without ENDMDL: restart this pose
+                    o.seek(0)
+                    o.truncate()
+            if o is None:
+                stray.append(line)
+                if line.startswith(b"ENDMDL"):  # ENDMDL with no MODEL still closes a pose
+                    out = os.path.join(out_dir, f"pose_{{len(poses) + 1}}.pdbqt")
+                    with open(out, "wb") as o:
+                        o.writelines(stray)
+                    o = None
+                    stray = []
+                    poses.append(out)
+                continue
+            o.write(line)
+            if line.startswith(b"ENDMDL"):
+                o.close()
+                o = None
                 poses.append(out)
-                model = []
-    if model:
-        idx += 1
-        out = os.path.join(out_dir, f"pose_{{idx}}.pdbqt")
-        with open(out, "w") as o:
-            o.writelines(model)
+    if o is not None:
+        o.close()
+        poses.append(out)
+    elif stray:
+        out = os.path.join(out_dir, f"pose_{{len(poses) + 1}}.pdbqt")
+        with open(out, "wb") as o:
+            o.writelines(stray)
         poses.append(out)
     return poses
 
 
+def _sendfile_into(dst, src_path):
+    """Append the whole of src_path to the open binary file dst, in-kernel where sendfile exists"""
+    with open(src_path, "rb") as src:
+        size = os.fstat(src.fileno()).st_size
+        offset = 0
+        dst.flush()
+        try:
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except (AttributeError, OSError):
+            src.seek(offset)
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def fast_copy(src, dst):
+    """Copy file contents and metadata like shutil.copy2, with the data moved by sendfile"""
+    with open(dst, "wb") as out:
+        _sendfile_into(out, src)
+    shutil.copystat(src, dst)
+
+
 def merge_pdbqt(rec, lig, outp):
     """Merge receptor and ligand into single PDB file"""
-    with open(outp, "w") as out:
-        out.write(open(rec).read())
-        out.write(open(lig).read())
-
+    with open(outp, "wb") as out:
+        _sendfile_into(out, rec)
+        _sendfile_into(out, lig)
+
+
+_INTERACTION_MAP = {{
+    'hydrophobic_interactions': 'hydrophobic_interaction',
+    'hydrogen_bonds': 'hydrogen_bond',
+    'water_bridges': 'water_bridge',
+    'salt_bridges': 'salt_bridge',
+    'pi_stacks': 'pi_stack',
+    'pi_cation_interactions': 'pi_cation_interaction',
+    'halogen_bonds': 'halogen_bond',
+    'metal_complexes': 'metal_complex'
+}}
+_INTERACTION_TYPE_NAMES = {{plural: plural.replace('_', ' ').title() for plural in _INTERACTION_MAP}}
+# Per-type JSON files that are not written (they are covered by interactions_all.json)
+_SKIP_JSON_TYPES = {{'Hydrogen Bonds', 'Hydrophobic Interactions', 'Salt Bridges'}}
+
+def json_bytes(obj, indent=False):
+    """UTF-8 JSON through orjson when installed, stdlib json otherwise"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+def _write_rows_csv(path, keys, rows):
+    """CSV with header `keys`; rows are flattened to lists up front (no per-row DictWriter checks)"""
+    with open(path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(keys)
+        writer.writerows([[d.get(k, '') for k in keys] for d in rows])
 
 def parse_plip_xml(xml_path, output_dir):
     """Parse PLIP XML output and create CSV/JSON files"""
@@ -305,47 +350,40 @@ def parse_plip_xml(xml_path, output_dir):
         root = tree.getroot()
         all_interactions = []
         interactions_by_type = {{}}
+        keys_by_type = {{}}
         
         for bindingsite in root.findall('.//bindingsite'):
             interactions_node = bindingsite.find('interactions')
             if not interactions_node:
                 continue
             identifiers = bindingsite.find('identifiers')
-            site_info = {{
-                'ligand_id': identifiers.find('hetid').text if identifiers.find('hetid') is not None else '',
-                'chain': identifiers.find('chain').text if identifiers.find('chain') is not None else '',
-                'position': identifiers.find('position').text if identifiers.find('position') is not None else ''
-            }}
-            
-            interaction_map = {{
-                'hydrophobic_interactions': 'hydrophobic_interaction',
-                'hydrogen_bonds': 'hydrogen_bond',
-                'water_bridges': 'water_bridge',
-                'salt_bridges': 'salt_bridge',
-                'pi_stacks': 'pi_stack',
-                'pi_cation_interactions': 'pi_cation_interaction',
-                'halogen_bonds': 'halogen_bond',
-                'metal_complexes': 'metal_complex'
-            }}
+            site_info = {{}}
+            for key, tag in (('ligand_id', 'hetid'), ('chain', 'chain'), ('position', 'position')):
+                node = identifiers.find(tag)
+                site_info[key] = node.text if node is not None else ''
             
-            for plural, singular in interaction_map.items():
+            for plural, singular in _INTERACTION_MAP.items():
                 coll = interactions_node.find(plural)
                 if not coll:
                     continue
-                interaction_type_name = plural.replace('_', ' ').title()
-                if interaction_type_name not in interactions_by_type:
-                    interactions_by_type[interaction_type_name] = []
+                interaction_type_name = _INTERACTION_TYPE_NAMES[plural]
+                bucket = interactions_by_type.setdefault(interaction_type_name, [])
+                # Column names are collected while parsing, so no rescans before writing
+                type_keys = keys_by_type.setdefault(interaction_type_name, set())
                 for interaction in coll.findall(singular):
                     data = {{**site_info, 'interaction_type': interaction_type_name}}
                     for child in interaction:
-                        if child.text and child.text.strip():
-                            data[child.tag] = child.text.strip()
+                        text = child.text.strip() if child.text else ''
+                        if text:
+                            data[child.tag] = text
                         elif len(child) > 0:
                             for subchild in child:
-                                if subchild.text and subchild.text.strip():
-                                    data[f"{{child.tag}}_{{subchild.tag}}"] = subchild.text.strip()
+                                subtext = subchild.text.strip() if subchild.text else ''
+                                if subtext:
+                                    data[f"{{child.tag}}_{{subchild.tag}}"] = subtext
                     all_interactions.append(data)
-                    interactions_by_type[interaction_type_name].append(data)
+                    bucket.append(data)
+                    type_keys.update(data)
         
         if all_interactions:
             csv_path = os.path.join(output_dir, 'interactions_all.csv')
@@ -353,55 +391,32 @@ def parse_plip_xml(xml_path, output_dir):
                 'interaction_type', 'dist', 'dist_d-a', 'dist_h-a', 'don_angle', 'donoridx',
                 'donortype', 'restype', 'resnr', 'acceptoridx', 'acceptortype',
             ]
-            all_keys = sorted(set(k for d in all_interactions for k in d.keys()))
+            all_keys = sorted(set().union(*keys_by_type.values()))
             ordered_keys = [k for k in preferred_order if k in all_keys] + \\
                            [k for k in all_keys if k not in preferred_order]
-            keys = ordered_keys
-
-            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=keys)
-                writer.writeheader()
-                writer.writerows(all_interactions)
-            
-            for itype, interactions in interactions_by_type.items():
-                if not interactions:
-                    continue
-                filename = f"{{itype.replace(' ', '_')}}.csv"
-                with open(os.path.join(output_dir, filename), 'w', newline='', encoding='utf-8') as f:
-                    type_keys = sorted(set(k for d in interactions for k in d.keys()))
-                    writer = csv.DictWriter(f, fieldnames=type_keys)
-                    writer.writeheader()
-                    writer.writerows(interactions)
+            _write_rows_csv(csv_path, ordered_keys, all_interactions)
             
             # Save all interactions to JSON
-            with open(os.path.join(output_dir, 'interactions_all.json'), 'w') as f:
-                json.dump(all_interactions, f, indent=2)
-            
-            # Skip specific interaction type JSON files
-            skip_json_types = ['Hydrogen Bonds', 'Hydrophobic Interactions', 'Salt Bridges']
+            with open(os.path.join(output_dir, 'interactions_all.json'), 'wb') as f:
+                f.write(json_bytes(all_interactions, indent=True))
             
+            # One pass over the per-type buckets: CSV, JSON and the summary counts
+            counts = {{}}
             for itype, interactions in interactions_by_type.items():
                 if not interactions:
                     continue
-                
-                # Skip the three specific JSON files
-                if itype in skip_json_types:
-                    continue
-                
-                filename = f"{{itype.replace(' ', '_')}}.json"
-                with open(os.path.join(output_dir, filename), 'w') as f:
-                    json.dump(interactions, f, indent=2)
+                counts[itype] = len(interactions)
+                stem = itype.replace(' ', '_')
+                _write_rows_csv(os.path.join(output_dir, f"{{stem}}.csv"), sorted(keys_by_type[itype]), interactions)
+                if itype not in _SKIP_JSON_TYPES:
+                    with open(os.path.join(output_dir, f"{{stem}}.json"), 'wb') as f:
+                        f.write(json_bytes(interactions, indent=True))
 
             summary_path = os.path.join(output_dir, 'interaction_summary.csv')
-            counts = {{}}
-            for i in all_interactions:
-                itype = i.get('interaction_type', 'Unknown')
-                counts[itype] = counts.get(itype, 0) + 1
             with open(summary_path, 'w', newline='') as f:
                 writer = csv.writer(f)
                 writer.writerow(['Interaction Type', 'Count'])
-                for itype, count in sorted(counts.items()):
-                    writer.writerow([itype, count])
+                writer.writerows(sorted(counts.items()))
             return True
         return False
     except Exception as e:
@@ -619,8 +634,8 @@ def aggregate_plip_results_v2(job_dir):
             
             # Also create JSON version
             all_poses_json_path = os.path.join(combo_folder, 'all_poses_interactions.json')
-            with open(all_poses_json_path, 'w', encoding='utf-8') as f:
-                json.dump(all_plip_interactions, f, indent=2)
+            with open(all_poses_json_path, 'wb') as f:
+                f.write(json_bytes(all_plip_interactions, indent=True))
             
             print(f"  Created all_poses_interactions.csv ({{len(all_plip_interactions)}} interactions)")
         else:
@@ -1233,6 +1248,70 @@ def get_all_pdbqt_files(path):
 # SINGLE COMBINATION PROCESSING
 # ============================================================================
 
+def process_single_pose(combo, combo_output_dir, i, selected_poses):
+    """Merge, convert and run PLIP for pose i; returns (i, completed, pose result)"""
+    ok = False
+    pose_file = selected_poses[i - 1]
+    print(f"\\n    Processing pose {{i}}/{{len(selected_poses)}}...")
+    pose_dir = os.path.join(combo_output_dir, f"pose_{{i}}")
+    os.makedirs(pose_dir, exist_ok=True)
+
+    merge_path = os.path.join(pose_dir, f"merge_{{i}}.pdbqt")
+    complex_path = os.path.join(pose_dir, "complex.pdb")
+
+    try:
+        # Merge receptor and ligand
+        merge_pdbqt(combo["receptor_path"], pose_file, merge_path)
+
+        # Convert to PDB format
+        safe_run(["obabel", merge_path, "-O", complex_path], cwd=pose_dir)
+
+        # Remove SMILES and add chain IDs in one pass
+        print("      Cleaning SMILES and adding chain IDs to complex.pdb...")
+        clean_complex_pdb(complex_path)
+
+        # Run PLIP
+        plip_cmd = [
+            "plip", "-f", complex_path, "-x", "-t", "-y",
+            "--nohydro", "--nofixfile", "--nofix"
+        ]
+
+        safe_run(plip_cmd, cwd=pose_dir)
+        xml_path = os.path.join(pose_dir, "report.xml")
+        
+
+        if os.path.exists(xml_path):
+            parse_plip_xml(xml_path, pose_dir)
+            
+            # Delete merge PDBQT file to save disk space  
+            if os.path.exists(merge_path):                 
+                os.remove(merge_path)                      
+                print(f"     x  Deleted merge_{{i}}.pdbqt") 
+            
+            print(f"      ✓ Pose {{i}} completed")    
+            ok = True
+        else:
+            print(f"      ⚠ Pose {{i}}: No XML output")
+
+    except Exception as e:
+        print(f"      ✗ Pose {{i}} failed: {{e}}")
+
+    files = os.listdir(pose_dir)
+    return i, ok, {{
+        "pose": i,
+        "folder": pose_dir,
+        "csv_files": [f for f in files if f.endswith(".csv")],
+        "json_files": [f for f in files if f.endswith(".json")],
+        "png_files": [f for f in files if f.endswith(".png")],
+        "xml_files": [f for f in files if f.endswith(".xml")],
+        "txt_files": [f for f in files if f.endswith(".txt")],
+        "pse_files": [f for f in files if f.endswith(".pse")],
+        "pml_files": [f for f in files if f.endswith(".pml")],
+        "pdb_files": [f for f in files if f.endswith(".pdb")],
+        "pdbqt_files": [f for f in files if f.endswith(".pdbqt")],
+    }}
+
+
 def execute_single_combination(combo, max_poses):
     """
     Execute PLIP analysis for a single receptor-ligand combination WITH CHECKPOINTS.
@@ -1274,9 +1353,9 @@ def execute_single_combination(combo, max_poses):
     ligand_copy = os.path.join(original_files_dir, combo["ligand_name"])
 
     if not os.path.exists(receptor_copy):
-        shutil.copy2(combo["receptor_path"], receptor_copy)
+        fast_copy(combo["receptor_path"], receptor_copy)
     if not os.path.exists(ligand_copy):
-        shutil.copy2(combo["ligand_path"], ligand_copy)
+        fast_copy(combo["ligand_path"], ligand_copy)
 
     # Split ligand file into individual poses
     poses_root = os.path.join(combo_output_dir, "poses")
@@ -1328,54 +1407,22 @@ def execute_single_combination(combo, max_poses):
     else:
         print(f"    Processing {{len(poses_to_process)}} remaining pose(s)...")
 
+    # Poses are independent (merge -> obabel -> PLIP, all subprocesses), so they run
+    # concurrently; combinations already share MAX_WORKERS threads, so the per-combination
+    # pool only takes its share of the CPUs. Checkpoints are written from this thread only.
     for i in range(1, len(selected_poses) + 1):
-        # ====================================================================
-        # CHECKPOINT: Skip if pose already completed
-        # ====================================================================
         if i in completed_poses:
             print(f"\\n    Pose {{i}}/{{len(selected_poses)}}: ✓ Already completed (skipping)")
-            continue
-
-        pose_file = selected_poses[i - 1]
-        print(f"\\n    Processing pose {{i}}/{{len(selected_poses)}}...")
-        pose_dir = os.path.join(combo_output_dir, f"pose_{{i}}")
-        os.makedirs(pose_dir, exist_ok=True)
-
-        merge_path = os.path.join(pose_dir, f"merge_{{i}}.pdbqt")
-        complex_path = os.path.join(pose_dir, "complex.pdb")
-
-        try:
-            # Merge receptor and ligand
-            merge_pdbqt(combo["receptor_path"], pose_file, merge_path)
-
-            # Convert to PDB format
-            safe_run(["obabel", merge_path, "-O", complex_path], cwd=pose_dir)
-
-            # Remove SMILES from PDB
-            print("      Cleaning SMILES from complex.pdb...")
-            remove_smiles_from_pdb(complex_path)
-            print("      Adding chain IDs to complex.pdb...") 
-            add_chain_ids_to_pdb(complex_path)                 
-
-            # Run PLIP
-            plip_cmd = [
-                "plip", "-f", complex_path, "-x", "-t", "-y",
-                "--nohydro", "--nofixfile", "--nofix"
-            ]
-
-            safe_run(plip_cmd, cwd=pose_dir)
-            xml_path = os.path.join(pose_dir, "report.xml")
-            
 
-            if os.path.exists(xml_path):
-                parse_plip_xml(xml_path, pose_dir)
-                
-                # Delete merge PDBQT file to save disk space  
-                if os.path.exists(merge_path):                 
-                    os.remove(merge_path)                      
-                    print(f"     x  Deleted merge_{{i}}.pdbqt") 
-                
-                print(f"      ✓ Pose {{i}} completed")    
+    pose_workers = max(1, min(len(poses_to_process), (os.cpu_count() or 1) // max(1, MAX_WORKERS)))
+    with ThreadPoolExecutor(max_workers=pose_workers) as pose_pool:
+        futures = [
+            pose_pool.submit(process_single_pose, combo, combo_output_dir, i, selected_poses)
+            for i in poses_to_process
+        ]
+        for future in as_completed(futures):
+            i, ok, pose_result = future.result()
+            if ok:
                 # ============================================================
                 # CHECKPOINT: Mark pose as completed
                 # ============================================================
@@ -1383,41 +1430,15 @@ def execute_single_combination(combo, max_poses):
                     "completed_poses": completed_poses + [i]
                 }})
                 completed_poses.append(i)
-                
             else:
-                print(f"      ⚠ Pose {{i}}: No XML output")
-                
                 # Mark as failed in checkpoint
                 existing_checkpoint = load_combination_checkpoint(combo_output_dir)
                 failed = existing_checkpoint.get("failed_poses", [])
                 update_combination_checkpoint(combo_output_dir, {{
                     "failed_poses": failed + [i]
                 }})
-
-        except Exception as e:
-            print(f"      ✗ Pose {{i}} failed: {{e}}")
-            
-            # Mark as failed in checkpoint
-            existing_checkpoint = load_combination_checkpoint(combo_output_dir)
-            failed = existing_checkpoint.get("failed_poses", [])
-            update_combination_checkpoint(combo_output_dir, {{
-                "failed_poses": failed + [i]
-            }})
-
-        files = os.listdir(pose_dir)
-        pose_results.append({{
-            "pose": i,
-            "folder": pose_dir,
-            "csv_files": [f for f in files if f.endswith(".csv")],
-            "json_files": [f for f in files if f.endswith(".json")],
-            "png_files": [f for f in files if f.endswith(".png")],
-            "xml_files": [f for f in files if f.endswith(".xml")],
-            "txt_files": [f for f in files if f.endswith(".txt")],
-            "pse_files": [f for f in files if f.endswith(".pse")],
-            "pml_files": [f for f in files if f.endswith(".pml")],
-            "pdb_files": [f for f in files if f.endswith(".pdb")],
-            "pdbqt_files": [f for f in files if f.endswith(".pdbqt")],
-        }})
+            pose_results.append(pose_result)
+    pose_results.sort(key=lambda r: r["pose"])
 
     # ========================================================================
     # CHECKPOINT: Mark entire combination as completed
@@ -42,6 +42,7 @@ Workflow:
 import os
 import sys
 import json
+import hashlib
 import subprocess
 import re
 import shutil
@@ -79,6 +80,14 @@ PREPARED_DIR = OUTPUT_FOLDER / "prepared_files"
 RFL_OUTPUT_DIR = OUTPUT_FOLDER / "rfl_outputs"
 RESULTS_DIR = OUTPUT_FOLDER / "results"
 
+# Score patterns, compiled once rather than per pose line / per RFL output
+VINA_RESULT_RE = re.compile(r"RESULT:\\s+([-\\d.]+)")
+ML_SCORE_RES = (
+    re.compile(r"[Pp]redicted\\s+affinity[:\\s]+([\\-\\d.]+)"),
+    re.compile(r"[Ss]core[:\\s]+([\\-\\d.]+)"),
+    re.compile(r"[Aa]ffinity[:\\s]+([\\-\\d.]+)"),
+)
+
 # MGLTools paths
 MGL_PYTHON = None
 MGL_SCRIPTS = None
@@ -187,7 +196,7 @@ def split_ligand_poses(ligand_file: Path, output_base: Path, max_poses: int) ->
                     vina_score = None
                     
                 elif line.startswith("REMARK VINA RESULT"):
-                    match = re.search(r"RESULT:\\s+([-\\d.]+)", line)
+                    match = VINA_RESULT_RE.search(line)
                     if match:
                         vina_score = float(match.group(1))
                     current_pose.append(line)
@@ -237,7 +246,36 @@ def split_ligand_poses(ligand_file: Path, output_base: Path, max_poses: int) ->
 # PHASE 3: CONVERT RECEPTOR PDBQT → PDB
 # ============================================================================
 
+# Receptor content digest -> first PDB converted from it. Every pose of a receptor
+# gets its own job folder, so without this the same receptor is re-converted per pose.
+_RECEPTOR_PDB_CACHE = {{}}
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
 def convert_receptor_to_pdb(pdbqt_file: Path, output_dir: Path) -> Optional[Path]:
+    """Convert receptor PDBQT to PDB, reusing an earlier conversion of identical content."""
+    pdb_file = output_dir / pdbqt_file.with_suffix(".pdb").name
+    try:
+        key = _file_digest(pdbqt_file)
+    except OSError:
+        key = None
+
+    cached = _RECEPTOR_PDB_CACHE.get(key)
+    if cached is not None and cached.exists():
+        shutil.copyfile(cached, pdb_file)
+        return pdb_file
+
+    result = _convert_receptor_to_pdb(pdbqt_file, output_dir)
+    if result and key:
+        _RECEPTOR_PDB_CACHE[key] = result
+    return result
+
+def _convert_receptor_to_pdb(pdbqt_file: Path, output_dir: Path) -> Optional[Path]:
     """Convert receptor PDBQT to PDB."""
     pdb_file = output_dir / pdbqt_file.with_suffix(".pdb").name
     
@@ -477,14 +515,8 @@ def run_rfl_score_on_job(job_info: Dict) -> Optional[Dict]:
         
         # Parse ML score
         ml_score = None
-        patterns = [
-            r"[Pp]redicted\\s+affinity[:\\s]+([\\-\\d.]+)",
-            r"[Ss]core[:\\s]+([\\-\\d.]+)",
-            r"[Aa]ffinity[:\\s]+([\\-\\d.]+)"
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, output)
+        for pattern in ML_SCORE_RES:
+            match = pattern.search(output)
             if match:
                 ml_score = float(match.group(1))
                 break
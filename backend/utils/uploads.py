@@ -0,0 +1,14 @@
+# backend/utils/uploads.py
+import aiofiles
+from fastapi import UploadFile
+
+
+async def write_upload(upload: UploadFile, dest, chunk_size: int = 1 << 20) -> None:
+    """
+    Stream an upload to dest in chunk_size pieces without blocking the event loop.
+    Memory use stays at one chunk whatever the upload size.
+    """
+    await upload.seek(0)
+    async with aiofiles.open(dest, "wb") as f:
+        while chunk := await upload.read(chunk_size):
+            await f.write(chunk)